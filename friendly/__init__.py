@@ -34,7 +34,7 @@ __version__ = "0.4.9"
 
 # ===========================================
 
-import inspect
+import importlib.machinery
 from pathlib import Path
 
 from friendly_traceback import editors_helpers, set_stream
@@ -43,8 +43,12 @@ from friendly_traceback.config import session
 from friendly_traceback import exclude_directory_from_traceback
 from friendly_traceback import set_lang as ft_set_lang
 
-from .my_gettext import current_lang
-from friendly import rich_formatters, theme
+from .my_gettext import current_lang, language  # noqa
+from friendly import rich_formatters
+from .sink import BufferedSink
+
+# friendly.theme, and with it Rich and pygments, is only imported by
+# set_formatter() when a Rich-based formatter is requested.
 
 
 exclude_directory_from_traceback(os.path.dirname(__file__))
@@ -62,8 +66,12 @@ def run(
     ipython_prompt=True,
 ):
     """Given a filename (relative or absolute path) ending with the ".py"
-    extension, this function uses the
-    more complex ``exec_code()`` to run a file.
+    extension, this function runs the file. Its code is obtained like
+    importlib does for modules, reusing the bytecode cached in
+    ``__pycache__`` if the file has not changed; if it cannot be
+    compiled, the more complex ``exec_code()`` is used to explain why.
+    A relative filename is relative to the file from which ``run()``
+    is called.
 
     If console is set to ``False``, ``run()`` returns an empty dict
     if a ``SyntaxError`` was raised, otherwise returns the dict in
@@ -97,14 +105,17 @@ def run(
     _ = current_lang.translate
     if include is None:
         include = "friendly_tb" if console else "explain"
+    if callable(redirect) and not isinstance(redirect, BufferedSink):
+        # Explanations are then written in one piece.
+        redirect = BufferedSink(redirect)
     if args is not None:
         sys.argv = [filename, *list(args)]
     else:
         filename = Path(filename)
         if not filename.is_absolute():
-            frame = inspect.stack()[1]
-            # This is the file from which run() is called
-            run_filename = Path(frame[0].f_code.co_filename)
+            # This is the file from which run() is called; only this frame
+            # is looked at, unlike with inspect.stack().
+            run_filename = Path(sys._getframe(1).f_code.co_filename)  # noqa
             run_dir = run_filename.parent.absolute()
             filename = run_dir.joinpath(filename)
 
@@ -116,9 +127,24 @@ def run(
     set_lang(lang)
     session.set_formatter(formatter)
 
-    module_globals = editors_helpers.exec_code(
-        path=filename, lang=lang, include=include
-    )
+    # Like importlib does for modules, the bytecode cached in __pycache__
+    # is used if the file has not changed since it was last compiled.
+    loader = importlib.machinery.SourceFileLoader("__main__", str(filename))
+    try:
+        code = loader.get_code("__main__")
+    except Exception:  # noqa
+        code = None
+    if code is None:
+        # The problem, such as a SyntaxError, is explained by exec_code().
+        module_globals = editors_helpers.exec_code(
+            path=filename, lang=lang, include=include
+        )
+    else:
+        module_globals = {"__name__": "__main__"}
+        try:
+            exec(code, module_globals)
+        except Exception:  # noqa
+            session.explain_traceback()
     if console:  # pragma: no cover
         start_console(
             local_vars=module_globals,
@@ -133,11 +159,37 @@ def run(
 
 
 def set_formatter(
-    formatter=None, color_system="auto", force_jupyter=None, background=None
+    formatter=None,
+    color_system="auto",
+    force_jupyter=None,
+    background=None,
+    lazy=False,
+    file=None,
 ):
     """Sets the default formatter. If no argument is given, a default
     formatter is used.
+
+    If ``lazy`` is ``True``, the formatter, including a Rich console
+    if one is needed, is only created when it is first used.
+
+    ``file`` is the file used by the Rich console for the ``"dark"`` and
+    ``"light"`` formatters, ``sys.stdout`` by default; a ``BufferedSink``
+    can be used so that each explanation is written at once.
     """
+    if lazy:
+        defer_formatter(
+            lambda: set_formatter(
+                formatter,
+                color_system=color_system,
+                force_jupyter=force_jupyter,
+                background=background,
+                file=file,
+            )
+        )
+        return
+    if formatter in ["dark", "light", "interactive-dark", "interactive"]:
+        from friendly import theme
+
     session.rich_add_vspace = True
     session.use_rich = True
     session.jupyter_button_style = ""
@@ -147,6 +199,7 @@ def set_formatter(
             color_system=color_system,
             force_jupyter=force_jupyter,
             background=background,
+            file=file,
         )
         set_stream(redirect=rich_formatters.rich_writer)
         formatter = rich_formatters.rich_markdown
@@ -169,12 +222,49 @@ def set_formatter(
         )
         formatter = rich_formatters.jupyter_interactive
         set_stream()
+    elif formatter == "json":
+        session.use_rich = False
+        set_stream()
+        formatter = rich_formatters.json
+    elif formatter == "html":
+        session.use_rich = False
+        set_stream()
+        formatter = rich_formatters.html
     else:
         session.use_rich = False
         set_stream()
     ft_set_formatter(formatter=formatter)
 
 
+def defer_formatter(setup):
+    """Sets a temporary formatter which, when first used, calls ``setup()``
+    to set the actual formatter and then uses it.
+
+    This is used to avoid creating Rich consoles, and importing Rich and
+    pygments, in environments where no exception might ever be raised.
+    """
+
+    def formatter(info, include="friendly_tb"):
+        build_deferred_formatter()
+        return session.formatter(info, include=include)
+
+    formatter.deferred = setup
+    session.use_rich = False
+    set_stream()
+    ft_set_formatter(formatter=formatter)
+
+
+def build_deferred_formatter():
+    """Sets the actual formatter if it has been deferred.
+    A width chosen with set_width() in the meantime is then applied."""
+    setup = getattr(session.formatter, "deferred", None)
+    if setup is None:
+        return
+    setup()
+    if session.use_rich and session.rich_width is not None:
+        session.console.width = session.rich_width
+
+
 def start_console(  # pragma: no cover
     local_vars=None,
     formatter="light",
@@ -200,6 +290,143 @@ def start_console(  # pragma: no cover
     )
 
 
+def load_ipython_extension(ipython):  # pragma: no cover
+    """Makes friendly available using ``%load_ext friendly`` in IPython
+    or in a Jupyter notebook. Only the traceback hooks and the console
+    helpers are set up at this point; the formatter is created
+    when the first traceback is shown.
+    """
+    if type(ipython).__name__ == "ZMQInteractiveShell":
+        from friendly import jupyter as friendly_module
+    else:
+        from friendly import ipython as friendly_module
+
+    ipython.push(friendly_module.helpers)
+
+
+def render(
+    exception,
+    formatter="dark",
+    include="friendly_tb",
+    lang=None,
+    width=80,
+    output="ansi",
+):
+    """Returns the information about an exception formatted as a string,
+    instead of writing it.
+
+    ``exception`` is either an exception instance, whose information is
+    obtained in the language ``lang`` (by default, the current one), or
+    a dict of information previously obtained, such as the one recorded
+    for the last exception shown.
+
+    ``formatter`` is either ``"dark"`` or ``"light"``, for the output
+    obtained with Rich in a console, or one of ``"repl"``, ``"markdown"``,
+    ``"docs"``, ``"json"`` or ``"html"``.
+
+    For ``"dark"`` and ``"light"``, ``width`` is the number of columns,
+    and ``output`` is one of ``"ansi"`` (text with colour codes),
+    ``"text"`` or ``"html"``; these are ignored for the other formatters.
+
+    Rich consoles, and the results for the same information at the
+    same width, are reused between calls.
+    """
+    from . import renderer
+
+    return renderer.render(
+        exception,
+        formatter=formatter,
+        include=include,
+        lang=lang,
+        width=width,
+        output=output,
+    )
+
+
+async def render_async(
+    exception,
+    formatter="dark",
+    include="friendly_tb",
+    lang=None,
+    width=80,
+    output="ansi",
+    timeout=None,
+):
+    """Asyncio counterpart of render(), which does not block the event loop:
+    the information is obtained and formatted in a separate thread, at most
+    ``friendly.renderer.MAX_WORKERS`` exceptions being handled at a time.
+
+    ``timeout`` is a number of seconds after which asyncio.TimeoutError
+    is raised. As with cancellation, a rendering already started is not
+    interrupted, but its result is discarded.
+    """
+    from . import renderer
+
+    return await renderer.render_async(
+        exception,
+        timeout=timeout,
+        formatter=formatter,
+        include=include,
+        lang=lang,
+        width=width,
+        output=output,
+    )
+
+
+def run_many(
+    filenames,
+    args=None,
+    lang=None,
+    include="explain",
+    formatter="repl",
+    timeout=None,
+    processes=None,
+):
+    """Runs many scripts, as ``run(filename, console=False)`` would, in a pool
+    of ``processes`` worker processes (by default, one per CPU), created
+    once friendly has been imported.
+
+    ``args``, if given, is a list containing the command line arguments
+    of each script. ``formatter`` is either ``"repl"``, ``"docs"``,
+    ``"markdown"``, ``"json"``, ``"html"`` or a formatter function.
+    A script running for more than ``timeout`` seconds is interrupted;
+    this is not available on Windows.
+
+    Returns a list of dicts, in the same order as ``filenames``, with
+    the items ``"filename"``, ``"output"`` (what the script printed),
+    ``"explanation"`` (empty if no exception was raised), ``"timed_out"``,
+    ``"exit_code"``, which is ``None`` unless the script called
+    ``sys.exit()`` or was interrupted, and ``"missing"``, which is ``True``
+    if the file does not exist.
+    """
+    from . import batch
+
+    return batch.run_many(
+        filenames,
+        args=args,
+        lang=lang,
+        include=include,
+        formatter=formatter,
+        timeout=timeout,
+        processes=processes,
+    )
+
+
+def set_disk_cache(path=None, max_size=None):
+    """Keeps the explanations laid out by Rich in an SQLite database,
+    so that they can be reused by other processes, such as other
+    Jupyter kernels, showing the same exceptions.
+
+    ``path`` is the database file, by default ``~/.cache/friendly/rendered.sqlite``,
+    and ``max_size`` the approximate maximum size of the content kept,
+    in bytes (default: 50 MB). Use ``friendly.disk_cache.disable()``
+    to stop using it.
+    """
+    from . import disk_cache
+
+    disk_cache.enable(path, max_size=max_size)
+
+
 def set_lang(lang):
     ft_set_lang(lang)
     current_lang.install(lang)
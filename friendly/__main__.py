@@ -9,19 +9,28 @@ command line. You can find more details by doing::
 
 """
 import argparse
+import functools
+import json
+import linecache
+import os
 import platform
 import runpy
 import sys
+import sysconfig
+import time
 
+from contextlib import contextmanager
 from importlib import import_module
 from pathlib import Path
 
 from friendly_traceback import explain_traceback, exclude_file_from_traceback, install
+from friendly_traceback import set_stream
 from friendly_traceback import __version__ as ft_version
 from friendly_traceback import debug_helper
 
-from friendly import console, __version__
-from friendly import set_formatter
+from friendly import __version__
+from friendly import rich_formatters, set_formatter
+from friendly.sink import BufferedSink
 from .my_gettext import current_lang
 
 # TODO: add friendly-traceback AND friendly version
@@ -55,6 +64,222 @@ def import_function(dotted_path: str) -> type:
         ) from err
 
 
+TIMINGS = {}
+
+
+@contextmanager
+def timed(name):
+    """Adds the time spent in a block of code to TIMINGS[name]."""
+    start = time.perf_counter()
+    try:
+        yield
+    finally:
+        TIMINGS[name] = TIMINGS.get(name, 0) + time.perf_counter() - start
+
+
+def time_function(module, function_name, name):
+    """Replaces a function in a module by a version which adds the time
+    spent in it to TIMINGS[name]."""
+    function = getattr(module, function_name)
+
+    @functools.wraps(function)
+    def timed_function(*args, **kwargs):
+        with timed(name):
+            return function(*args, **kwargs)
+
+    setattr(module, function_name, timed_function)
+
+
+def report_timings(json_path=None):
+    """Prints the time spent in each step, or saves it as JSON if a
+    path is given. Times are in seconds."""
+    _ = current_lang.translate
+    timings = {
+        "startup": TIMINGS.get("startup", 0),
+        "install": TIMINGS.get("install", 0),
+        "set_formatter": TIMINGS.get("set_formatter", 0),
+        "run_path": TIMINGS.get("run_path", 0),
+        # explain_traceback() includes the time spent in the formatter
+        # and the writer, which we show separately.
+        "traceback_analysis": TIMINGS.get("explain_traceback", 0)
+        - TIMINGS.get("markdown", 0)
+        - TIMINGS.get("rich", 0),
+        "markdown": TIMINGS.get("markdown", 0),
+        "rich": TIMINGS.get("rich", 0),
+    }
+    if json_path is not None:
+        with open(json_path, "w", encoding="utf8") as f:
+            json.dump(timings, f, indent=4)
+        return
+    descriptions = {
+        "startup": _("Interpreter startup and imports (CPU time)"),
+        "install": "install()",
+        "set_formatter": "set_formatter()",
+        "run_path": _("Running the script"),
+        "traceback_analysis": _("Traceback analysis"),
+        "markdown": _("Markdown generation"),
+        "rich": _("Rendering with Rich"),
+    }
+    print("\n" + _("Time spent (ms):"), file=sys.stderr)
+    for name, value in timings.items():
+        print(f"    {descriptions[name]:45} {value * 1000:10.1f}", file=sys.stderr)
+
+
+WATCH_INTERVAL = 0.5  # not a constant; seconds between checks for changes
+
+
+def run_source(source, errors=None):
+    """Runs a script, explaining the exception raised if any, and returns
+    the dict in which it was run. If a list is given as errors,
+    the exception raised is appended to it."""
+    try:
+        with timed("run_path"):
+            return runpy.run_path(source, run_name="__main__")
+    except Exception as e:  # noqa
+        if errors is not None:
+            errors.append(e)
+        with timed("explain_traceback"):
+            explain_traceback()
+    return {}
+
+
+def is_installed(path):
+    """Returns True if a file is part of the standard library or of an
+    installed package, rather than of the user's code."""
+    paths = sysconfig.get_paths()
+    for name in ("stdlib", "platstdlib", "purelib", "platlib"):
+        if name in paths and Path(paths[name]).resolve() in path.parents:
+            return True
+    return False
+
+
+def local_modules(directory):
+    """Returns the file names of the modules imported from a directory,
+    such as the one containing the script, excluding installed packages."""
+    modules = {}
+    for name, module in list(sys.modules.items()):
+        filename = getattr(module, "__file__", None)
+        if not filename:
+            continue
+        path = Path(filename).resolve()
+        if directory in path.parents and not is_installed(path):
+            modules[str(path)] = name
+    return modules
+
+
+def error_filenames(exception, directory):
+    """Returns the names of the files from a directory involved in an
+    exception, such as a module whose import failed and which is thus
+    not found in sys.modules."""
+    from friendly.code_cache import traceback_filenames
+
+    filenames = set()
+    traceback_filenames(exception, filenames)
+    paths = []
+    for filename in filenames:
+        path = Path(filename).resolve()
+        if path.is_file() and directory in path.parents and not is_installed(path):
+            paths.append(str(path))
+    return paths
+
+
+def get_mtimes(paths):
+    mtimes = {}
+    for path in paths:
+        try:
+            mtimes[path] = os.stat(path).st_mtime_ns
+        except OSError:
+            mtimes[path] = None
+    return mtimes
+
+
+def watch(source, errors=None):
+    """Runs a script again each time it, or one of the modules imported
+    from its directory, is changed. Modules which have not changed, as well
+    as friendly and Rich, remain loaded, so that this is much faster than
+    starting Python again.
+
+    errors contains the exceptions raised by the first run, if any.
+    """
+    _ = current_lang.translate
+    script = Path(source).resolve()
+    print(
+        "\n"
+        + _("Watching {filename} for changes; press Ctrl+C to stop.").format(
+            filename=source
+        )
+    )
+    # Files seen in previous runs are still watched: a module whose import
+    # failed is no longer in sys.modules, but it must be watched so that
+    # the script is run again once it is fixed.
+    paths = {str(script): None}
+    errors = errors or []
+    while True:
+        for error in errors:
+            for path in error_filenames(error, script.parent):
+                paths.setdefault(path, None)
+        paths.update(local_modules(script.parent))
+        paths[str(script)] = None
+        mtimes = get_mtimes(paths)
+        try:
+            while get_mtimes(paths) == mtimes:
+                time.sleep(WATCH_INTERVAL)
+        except KeyboardInterrupt:
+            return
+        for path, mtime in get_mtimes(paths).items():
+            if mtime != mtimes[path] and paths[path] is not None:
+                # Imported again by the script.
+                sys.modules.pop(paths[path], None)
+        linecache.checkcache()
+        print("\n" + _("Running {filename} again.").format(filename=source) + "\n")
+        errors = []
+        try:
+            run_source(source, errors)
+        except SystemExit:
+            pass
+        except KeyboardInterrupt:
+            return
+
+
+def run_many(args, include):
+    """Runs the scripts given with --many, and prints the results."""
+    _ = current_lang.translate
+    from friendly import run_many as friendly_run_many
+    from friendly.batch import FORMATTERS
+
+    if args.formatter and args.formatter not in FORMATTERS:
+        parser.error(
+            _("--many can only be used with the formatters {names}.").format(
+                names=", ".join(FORMATTERS)
+            )
+        )
+    filenames = [args.source, *args.args]
+    results = friendly_run_many(
+        filenames,
+        lang=args.lang,
+        include=include,
+        formatter=args.formatter or "repl",
+        timeout=args.timeout,
+        processes=args.processes,
+    )
+    for result in results:
+        print(f"===== {result['filename']} =====")
+        print(result["output"], end="")
+        if result["timed_out"]:
+            print(
+                _("The script was stopped after {timeout} seconds.").format(
+                    timeout=args.timeout
+                )
+            )
+        if result["exit_code"] is not None:
+            print(
+                _("The script exited with code {code}.").format(
+                    code=result["exit_code"]
+                )
+            )
+        print(result["explanation"])
+
+
 parser = argparse.ArgumentParser(
     formatter_class=argparse.RawDescriptionHelpFormatter,
     description=(
@@ -103,15 +328,25 @@ parser.add_argument(
 parser.add_argument(
     "-f",
     "--formatter",
-    help="""Specifies an output format (bw, dark, light, docs, markown, or markdown_docs)
-    or a custom formatter function, as a dotted path. By default, the console
-    will use dark if it is available.
+    help="""Specifies an output format (bw, dark, light, docs, html, json, markown,
+    or markdown_docs) or a custom formatter function, as a dotted path.
+    By default, dark is used if the output is a terminal; otherwise,
+    repl is used, which does not require Rich (see --rich).
 
     For example: --formatter friendly.rich_formatters.markdown is
     equivalent to --formatter markdown
     """,
 )
 
+parser.add_argument(
+    "--rich",
+    help="""Uses the 'dark' formatter, based on Rich, when no formatter is
+    specified even if the output is not a terminal, for example when it
+    is piped to another program.
+    """,
+    action="store_true",
+)
+
 parser.add_argument(
     "--background",
     help="""Specifies a background color to be used if either the 'dark' or the 'light'
@@ -120,6 +355,60 @@ parser.add_argument(
     """,
 )
 
+parser.add_argument(
+    "--html_stylesheet",
+    help="""Specifies the path of a stylesheet to be linked to, instead of being
+    embedded, by the 'html' formatter so that it can be shared by many
+    html documents. The stylesheet is written if it does not already exist.
+    """,
+)
+
+parser.add_argument(
+    "--profile",
+    help="""Shows the time spent starting Python, setting up friendly,
+    running the script and explaining the traceback, if any.
+    """,
+    action="store_true",
+)
+
+parser.add_argument(
+    "--profile_json",
+    help="""Like --profile, but the timings are saved as JSON in the
+    file specified instead of being printed.
+    """,
+)
+
+parser.add_argument(
+    "--watch",
+    help="""Runs the script again each time it, or a module imported from
+    its directory, is changed, without starting Python again.
+    """,
+    action="store_true",
+)
+
+parser.add_argument(
+    "--many",
+    help="""Runs the source and all the following arguments as separate
+    scripts, using a pool of processes, and shows what each of them printed
+    followed by the explanation of the exception raised, if any.
+    """,
+    action="store_true",
+)
+
+parser.add_argument(
+    "--timeout",
+    help="""With --many, the maximum time in seconds for each script.""",
+    type=float,
+)
+
+parser.add_argument(
+    "--processes",
+    help="""With --many, the number of processes used; by default,
+    one for each CPU.
+    """,
+    type=int,
+)
+
 parser.add_argument("--debug", help="""For developer use.""", action="store_true")
 parser.add_argument("--no_debug", help="""For developer use.""", action="store_true")
 
@@ -141,6 +430,13 @@ parser.add_argument(
 def main():
     _ = current_lang.translate
     args = parser.parse_args()
+    profile = args.profile or args.profile_json
+    if profile:
+        # Time since the process started would be preferable, but it
+        # is not available in a portable way.
+        TIMINGS["startup"] = time.process_time()
+        time_function(rich_formatters, "_markdown", "markdown")
+        time_function(rich_formatters, "rich_writer", "rich")
     if args.version:  # pragma: no cover
         print(f"\nFriendly version {__version__}")
         if not args.source:
@@ -157,18 +453,40 @@ def main():
     elif args.no_debug:  # pragma: no cover
         debug_helper.DEBUG = False
 
-    install(lang=args.lang, include=include)
-
-    if args.formatter:
-        formatter = args.formatter  # noqa
-        if formatter in ["repl", "dark", "light", "docs"]:
-            set_formatter(formatter, background=args.background)  # pragma: no cover
+    if args.many and args.source:
+        run_many(args, include)
+        return
+
+    with timed("install"):
+        install(lang=args.lang, include=include)
+
+    with timed("set_formatter"):
+        if args.formatter:
+            formatter = args.formatter  # noqa
+            if formatter in ["repl", "dark", "light", "docs", "html", "json"]:
+                set_formatter(formatter, background=args.background)  # pragma: no cover
+            else:
+                set_formatter(import_function(args.formatter))
+                formatter = "dark"  # for the console - should not be needed
+        elif args.rich or (sys.stdout.isatty() and sys.stderr.isatty()):
+            file = None
+            if not sys.stdout.isatty():
+                file = BufferedSink(sys.stdout.write)
+            set_formatter("dark", background=args.background, file=file)
+            formatter = "dark"
         else:
-            set_formatter(import_function(args.formatter))
-            formatter = "dark"  # for the console - should not be needed
-    else:
-        set_formatter("dark", background=args.background)
-        formatter = "dark"
+            # Colours would be lost; importing Rich and creating a
+            # console would only slow things down. The explanations are
+            # still written to stdout, as they are by the Rich console.
+            set_formatter("repl")
+            set_stream(redirect=BufferedSink(sys.stdout.write))
+            formatter = "repl"
+
+    if args.html_stylesheet:
+        if Path(args.html_stylesheet).exists():
+            rich_formatters.HTML_STYLESHEET = args.html_stylesheet
+        else:
+            rich_formatters.write_html_stylesheet(args.html_stylesheet)
 
     console_defaults = {}
     if args.source is not None:
@@ -182,12 +500,20 @@ def main():
 
         exclude_file_from_traceback(runpy.__file__)
         sys.argv = [args.source, *args.args]
-        try:
-            module_dict = runpy.run_path(args.source, run_name="__main__")
-            console_defaults.update(module_dict)
-        except Exception:  # noqa
-            explain_traceback()
+        if args.watch:
+            errors = []
+            try:
+                run_source(args.source, errors)
+            except SystemExit:
+                pass
+            watch(args.source, errors)
+            return
+        console_defaults.update(run_source(args.source))
+        if profile:
+            report_timings(args.profile_json)
         if sys.flags.interactive:  # pragma: no cover
+            from friendly import console
+
             console.start_console(
                 local_vars=console_defaults,
                 formatter=formatter,
@@ -197,6 +523,8 @@ def main():
             )
 
     else:  # pragma: no cover
+        from friendly import console
+
         console.start_console(
             local_vars=console_defaults,
             formatter=formatter,
@@ -0,0 +1,176 @@
+"""
+batch.py
+========
+
+Runs many scripts, such as submissions to an autograder, using run()
+with console=False in a pool of worker processes, and returns what each
+of them printed as well as the explanation of the exception raised, if any.
+
+Starting Python, and importing friendly and Rich, often takes much longer
+than running a small script. Where possible, the workers are thus created
+by forking the current process once these have been imported, and each
+of them runs many scripts. Each script is run in its own namespace, with
+its own sys.argv; the modules it imports are removed after it has run.
+"""
+import contextlib
+import io
+import multiprocessing
+import os
+import signal
+import sys
+
+from friendly_traceback.config import session
+
+from . import my_gettext
+from .sink import BufferedSink
+
+
+class ScriptTimeout(BaseException):
+    """Raised in a worker when a script runs for too long; it derives
+    from BaseException so that it is not explained as an error of the script."""
+
+
+_explanation = []  # what is written by friendly for the current script
+_sink = None
+
+
+def collect(text):
+    _explanation.append(text)
+
+
+def preload(lang, formatter):
+    """Imports what the workers need, so that it is shared by them."""
+    from . import renderer
+
+    for localedir in (my_gettext.LOCALEDIR, my_gettext.FT_LOCALEDIR):
+        my_gettext.get_catalog(localedir, lang or "en")
+    if formatter == "html" or callable(formatter):
+        from friendly import theme  # noqa - Rich and pygments
+    # Some modules used for the analysis are only imported when needed.
+    try:
+        undefined_name  # noqa
+    except NameError as e:
+        renderer.get_info(e, lang=lang)
+
+
+FORMATTERS = ["repl", "docs", "markdown", "json", "html"]
+
+
+def get_formatter(formatter):
+    from . import rich_formatters
+
+    named = {
+        "markdown": rich_formatters.markdown,
+        "json": rich_formatters.json,
+        "html": rich_formatters.html,
+    }
+    return named.get(formatter, formatter)
+
+
+def exit_code(code):
+    """Returns the exit status of a process ending with sys.exit(code)."""
+    if code is None:
+        return 0
+    if isinstance(code, int):
+        return code
+    return 1
+
+
+def run_script(task):
+    """Runs a single script in a worker and returns the result."""
+    from friendly import run
+
+    global _sink
+    filename, args, lang, include, formatter, timeout = task
+    if not os.path.isfile(filename):
+        # run() would explain an exception raised by friendly-traceback.
+        with my_gettext.language(lang or my_gettext.current_lang.lang):
+            _ = my_gettext.current_lang.translate
+            explanation = _("The file {filename} does not exist.").format(
+                filename=filename
+            )
+        return {
+            "filename": filename,
+            "output": "",
+            "explanation": explanation + "\n",
+            "timed_out": False,
+            "exit_code": None,
+            "missing": True,
+        }
+    if _sink is None:
+        _sink = BufferedSink(collect)
+    _explanation.clear()
+    output = io.StringIO()
+    saved_modules = set(sys.modules)
+    timed_out = False
+    code = None
+
+    def on_timeout(signum, frame):
+        raise ScriptTimeout
+
+    if timeout and hasattr(signal, "setitimer"):
+        signal.signal(signal.SIGALRM, on_timeout)
+        signal.setitimer(signal.ITIMER_REAL, timeout)
+    try:
+        with contextlib.redirect_stdout(output), contextlib.redirect_stderr(output):
+            run(
+                filename,
+                lang=lang,
+                include=include,
+                args=args,
+                console=False,
+                formatter=get_formatter(formatter),
+                redirect=_sink,
+            )
+    except ScriptTimeout:
+        timed_out = True
+    except SystemExit as e:
+        # The worker must survive, otherwise the pool waits for it forever.
+        code = exit_code(e.code)
+    except KeyboardInterrupt:
+        code = 130  # as for a process interrupted by Ctrl+C
+    finally:
+        if timeout and hasattr(signal, "setitimer"):
+            signal.setitimer(signal.ITIMER_REAL, 0)
+        for name in set(sys.modules) - saved_modules:
+            del sys.modules[name]
+        # Only the last exception of a script is kept; what(), why(),
+        # etc., are not used in a worker.
+        session.saved_info.clear()
+        session.friendly_info.clear()
+    _sink.emit()
+    return {
+        "filename": filename,
+        "output": output.getvalue(),
+        "explanation": "".join(_explanation),
+        "timed_out": timed_out,
+        "exit_code": code,
+        "missing": False,
+    }
+
+
+def run_many(
+    filenames,
+    args=None,
+    lang=None,
+    include="explain",
+    formatter="repl",
+    timeout=None,
+    processes=None,
+):
+    """See friendly.run_many()."""
+    if formatter not in FORMATTERS and not callable(formatter):
+        raise ValueError(f"Unknown formatter: {formatter}")
+    if args is None:
+        args = [[] for _filename in filenames]
+    tasks = [
+        (os.path.abspath(filename), list(script_args), lang, include, formatter, timeout)
+        for filename, script_args in zip(filenames, args)
+    ]
+    preload(lang, formatter)
+    if "fork" in multiprocessing.get_all_start_methods():
+        context = multiprocessing.get_context("fork")
+    else:  # pragma: no cover
+        context = multiprocessing.get_context()
+    with context.Pool(processes) as pool:
+        return pool.map(run_script, tasks, chunksize=1)
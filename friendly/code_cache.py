@@ -0,0 +1,124 @@
+"""
+code_cache.py
+=============
+
+The Friendly console keeps each code block entered, as though it was
+a separate file, so that tracebacks can show its content. In very long
+sessions, or when large blocks of code are pasted, this uses more and
+more memory.
+
+The number of code blocks kept, and their total size, are thus limited:
+the oldest ones are removed first. However, the code blocks in which
+functions or classes still in use were defined, as well as those
+appearing in the tracebacks recorded, are always kept.
+"""
+import collections
+import sys
+
+from friendly_traceback import source_cache
+from friendly_traceback.config import session
+
+MAX_BLOCKS = 1000  # not a constant
+MAX_SIZE = 5_000_000  # not a constant; in characters
+
+_blocks = collections.OrderedDict()  # filename: number of characters
+
+
+def set_limits(blocks=None, size=None):
+    """Changes the maximum number of code blocks and their total size.
+    A value of 0 removes the corresponding limit."""
+    global MAX_BLOCKS, MAX_SIZE
+    if blocks is not None:
+        MAX_BLOCKS = blocks or None
+    if size is not None:
+        MAX_SIZE = size or None
+
+
+def add(filename, source):
+    """Records a code block, which has been added to the source cache."""
+    _blocks[filename] = len(source)
+    _blocks.move_to_end(filename)
+
+
+def is_over_limits(blocks, size):
+    return (MAX_BLOCKS is not None and blocks > MAX_BLOCKS) or (
+        MAX_SIZE is not None and size > MAX_SIZE
+    )
+
+
+def traceback_filenames(exception, filenames):
+    """Adds the names of the files appearing in the traceback of an
+    exception, including chained exceptions, to a set."""
+    seen = set()
+    while exception is not None and id(exception) not in seen:
+        seen.add(id(exception))
+        if isinstance(exception, SyntaxError) and exception.filename:
+            filenames.add(exception.filename)
+        tb = exception.__traceback__
+        while tb is not None:
+            filenames.add(tb.tb_frame.f_code.co_filename)
+            tb = tb.tb_next
+        exception = exception.__cause__ or exception.__context__
+
+
+def code_filenames(obj, filenames):
+    """Adds the name of the file in which a function, a class,
+    or the class of an object, was defined to a set."""
+    code = getattr(obj, "__code__", None)
+    if code is not None:
+        filenames.add(code.co_filename)
+        return
+    cls = obj if isinstance(obj, type) else type(obj)
+    if cls.__module__ == "builtins" and cls is not obj:
+        return
+    for attribute in vars(cls).values():
+        function = getattr(attribute, "__func__", attribute)  # staticmethod, etc.
+        code = getattr(function, "__code__", None)
+        if code is not None:
+            filenames.add(code.co_filename)
+
+
+def referenced_filenames(namespace):
+    """Returns the names of the files which should be kept."""
+    filenames = set()
+    for tb_info in session.friendly_info:
+        traceback_filenames(tb_info.tb_data.value, filenames)
+    traceback_filenames(getattr(sys, "last_value", None), filenames)
+    for obj in list(namespace.values()):
+        try:
+            code_filenames(obj, filenames)
+        except Exception:  # noqa - objects with unusual attributes
+            pass
+    return filenames
+
+
+def evict(namespace):
+    """Removes the oldest code blocks, which are not referenced, until
+    the limits are no longer exceeded."""
+    size = sum(_blocks.values())
+    if not is_over_limits(len(_blocks), size):
+        return
+    keep = referenced_filenames(namespace)
+    for filename in list(_blocks):
+        if not is_over_limits(len(_blocks), size):
+            break
+        if filename in keep:
+            continue
+        size -= _blocks.pop(filename)
+        source_cache.cache.remove(filename)
+
+
+def get_usage():
+    """Returns the number of code blocks kept, their size and the limits."""
+    size = sum(
+        sys.getsizeof(line)
+        for filename in _blocks
+        for line in source_cache.cache.cache.get(filename, [])
+    )
+    return {
+        "blocks": len(_blocks),
+        "characters": sum(_blocks.values()),
+        "bytes": size,
+        "max_blocks": MAX_BLOCKS,
+        "max_size": MAX_SIZE,
+    }
@@ -11,13 +11,13 @@ import platform
 
 import friendly_traceback as ft
 
-from friendly_traceback import ft_console
+from friendly_traceback import ft_console, source_cache
 from friendly_traceback.config import session
 from friendly.rich_console_helpers import helpers
 from .my_gettext import current_lang
 
 import friendly
-from . import theme
+from . import code_cache, theme
 
 BANNER = "\nfriendly-traceback: {}\nfriendly: {}\nPython: {}\n".format(
     ft.__version__, friendly.__version__, platform.python_version()
@@ -61,6 +61,19 @@ class FriendlyConsole(ft_console.FriendlyTracebackConsole):
         self.check_for_builtins_changes()
         self.check_for_annotations()
 
+    def push(self, line):
+        """Push a line to the interpreter; see the parent class.
+
+        Once a code block is complete, it is recorded so that the number
+        of code blocks kept for showing tracebacks remains limited.
+        """
+        filename = self.fake_filename % self.counter
+        more = super().push(line)
+        if not more:
+            code_cache.add(filename, "".join(source_cache.cache.cache.get(filename, [])))
+            code_cache.evict(self.locals)
+        return more
+
     def runcode(self, code):
         """Execute a code object.
 
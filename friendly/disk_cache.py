@@ -0,0 +1,143 @@
+"""
+disk_cache.py
+=============
+
+Laying out an explanation with Rich takes much longer than obtaining it.
+When the same exceptions are shown by many processes, for example by the
+Jupyter kernels of students working on the same exercise on a given server,
+the lines rendered can be kept in an SQLite database shared by all of them::
+
+    friendly.set_disk_cache()  # or set_disk_cache(path, max_size)
+
+Entries are identified by a hash of the text rendered, which is obtained
+from the information about the exception in a given language, and of the
+width, theme and friendly version used. The least recently used entries
+are removed when the database exceeds its maximum size.
+"""
+import hashlib
+import json
+import os
+import threading
+import time
+
+from friendly_traceback import debug_helper
+
+MAX_SIZE = 50 * 1024 * 1024  # not a constant; in bytes
+TIMEOUT = 1  # not a constant; seconds to wait for another process
+
+_path = None
+_local = threading.local()  # SQLite connections cannot be shared by threads
+
+
+def default_path():
+    cache_dir = os.environ.get("XDG_CACHE_HOME") or os.path.join(
+        os.path.expanduser("~"), ".cache"
+    )
+    return os.path.join(cache_dir, "friendly", "rendered.sqlite")
+
+
+def is_enabled():
+    return _path is not None
+
+
+def enable(path=None, max_size=None):
+    """Uses the database at ``path``, creating it if needed."""
+    global _path, MAX_SIZE
+    if max_size is not None:
+        MAX_SIZE = max_size
+    path = os.path.abspath(os.path.expanduser(path or default_path()))
+    os.makedirs(os.path.dirname(path), exist_ok=True)
+    _path = path
+    get_connection()  # reports a problem with the file immediately
+
+
+def disable():
+    global _path
+    _path = None
+
+
+def get_connection():
+    """Returns the connection to the database for the current thread."""
+    import sqlite3
+
+    connection = getattr(_local, "connection", None)
+    if connection is not None and _local.path == _path:
+        return connection
+    connection = sqlite3.connect(_path, timeout=TIMEOUT)
+    # Readers and a writer from other processes do not block each other.
+    connection.execute("PRAGMA journal_mode=WAL")
+    connection.execute(
+        "CREATE TABLE IF NOT EXISTS entries ("
+        "key TEXT PRIMARY KEY, value TEXT, size INTEGER, last_used REAL)"
+    )
+    connection.execute(
+        "CREATE INDEX IF NOT EXISTS entries_last_used ON entries (last_used)"
+    )
+    connection.commit()
+    _local.connection = connection
+    _local.path = _path
+    return connection
+
+
+def make_key(*parts):
+    from friendly import __version__
+
+    content = json.dumps([__version__, parts], default=str)
+    return hashlib.sha256(content.encode("utf8")).hexdigest()
+
+
+def get(key):
+    """Returns the value stored for key, or None."""
+    import sqlite3
+
+    try:
+        connection = get_connection()
+        with connection:
+            row = connection.execute(
+                "SELECT value FROM entries WHERE key = ?", (key,)
+            ).fetchone()
+            if row is None:
+                return None
+            connection.execute(
+                "UPDATE entries SET last_used = ? WHERE key = ?", (time.time(), key)
+            )
+        return json.loads(row[0])
+    except (sqlite3.Error, ValueError) as e:
+        debug_helper.log(f"Disk cache: {e!r}")
+        return None
+
+
+def put(key, value):
+    """Stores a value which can be converted to json, then removes the
+    least recently used entries if the maximum size is exceeded."""
+    import sqlite3
+
+    content = json.dumps(value)
+    try:
+        connection = get_connection()
+        with connection:
+            connection.execute(
+                "INSERT OR REPLACE INTO entries VALUES (?, ?, ?, ?)",
+                (key, content, len(content), time.time()),
+            )
+            evict(connection)
+    except sqlite3.Error as e:
+        debug_helper.log(f"Disk cache: {e!r}")
+
+
+def evict(connection):
+    (total,) = connection.execute("SELECT TOTAL(size) FROM entries").fetchone()
+    if total <= MAX_SIZE:
+        return
+    # Some room is made, so that this is not done for each new entry.
+    target = total - 0.9 * MAX_SIZE
+    removed = 0
+    keys = []
+    for key, size in connection.execute(
+        "SELECT key, size FROM entries ORDER BY last_used"
+    ):
+        if removed >= target:
+            break
+        keys.append((key,))
+        removed += size
+    connection.executemany("DELETE FROM entries WHERE key = ?", keys)
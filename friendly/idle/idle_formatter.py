@@ -10,6 +10,9 @@ All that matters is that, it is debugged and works appropriately! ;-)
 import sys
 from friendly_traceback.base_formatters import select_items, no_result, repl_indentation
 
+from .. import metrics
+from ..truncate import truncate_info
+
 if sys.version_info >= (3, 9, 5):
     repl_indentation["suggest"] = "single"  # more appropriate value
 
@@ -91,6 +94,7 @@ def format_traceback(text):
     return new_lines
 
 
+@metrics.counted_formatter("idle_formatter")
 def idle_formatter(info, include="friendly_tb"):
     """Formatter that takes care of color definitions."""
     # The explanation for SyntaxError and subclasses states that the
@@ -101,6 +105,7 @@ def idle_formatter(info, include="friendly_tb"):
         or "TabError" in info["shortened_traceback"]
     )
     items_to_show = select_items(include)
+    info = truncate_info(info, items_to_show)
     spacing = {"single": " " * 4, "double": " " * 8, "none": ""}
     result = ["\n"]
     for item in items_to_show:
@@ -1,7 +1,6 @@
 """Experimental module to automatically install Friendly
 as a replacement for the standard traceback in IDLE."""
 
-import inspect
 from pathlib import Path
 import sys  # noqa
 
@@ -197,9 +196,8 @@ def run(
 
     filename = Path(filename)
     if not filename.is_absolute():
-        frame = inspect.stack()[1]
         # This is the file from which run() is called
-        run_filename = Path(frame[0].f_code.co_filename)
+        run_filename = Path(sys._getframe(1).f_code.co_filename)  # noqa
         run_dir = run_filename.parent.absolute()
         filename = run_dir.joinpath(filename)
 
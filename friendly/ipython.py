@@ -42,7 +42,8 @@ exclude_file_from_traceback(compilerop.__file__)
 install(include="friendly_tb")
 
 # By default, we assume a terminal with a dark background.
-set_formatter("dark")  # noqa
+# The Rich console is only created when the first traceback is shown.
+set_formatter("dark", lazy=True)  # noqa
 __all__ = list(helpers.keys())
 
 print(
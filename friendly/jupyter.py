@@ -1,34 +1,60 @@
-from rich import jupyter as rich_jupyter
-
 from friendly_traceback import session  # noqa
 from .ipython import *  # noqa
 from .ipython import helpers
-from friendly import rich_formatters
+from friendly import defer_formatter, rich_formatters
 from friendly.my_gettext import current_lang
 
 
-# For Jupyter output, Rich specifies a set of fonts starting with Menlo and
-# ending with monospace as last resort whereas Jupyter notebooks just
-# specify monospace. To make font-size more consistent, we remove the
-# font-specification from Rich.
-rich_jupyter.JUPYTER_HTML_FORMAT = (
-    "<pre style='white-space:pre;overflow-x:auto;line-height:normal'>{code}</pre>"
-)
+def use_jupyter_fonts():
+    """For Jupyter output, Rich specifies a set of fonts starting with Menlo
+    and ending with monospace as last resort whereas Jupyter notebooks just
+    specify monospace. To make font-size more consistent, we remove the
+    font-specification from Rich, both for friendly's formatters and for
+    Rich's own output, such as that of rich.print()."""
+    from rich import jupyter as rich_jupyter
+
+    html_format = (
+        "<pre style='white-space:pre;overflow-x:auto;line-height:normal'>{code}</pre>"
+    )
+    rich_formatters.JUPYTER_HTML_FORMAT = html_format
+    rich_jupyter.JUPYTER_HTML_FORMAT = html_format
 
 
 old_set_formatter = set_formatter  # noqa
 
 
 def set_formatter(
-    formatter=None, color_system="auto", force_jupyter=None, background=None
+    formatter=None,
+    color_system="auto",
+    force_jupyter=None,
+    background=None,
+    lazy=False,
 ):
     """Sets the default formatter. If no argument is given, a default
     formatter is used.
     """
+    if lazy:
+        defer_formatter(
+            lambda: set_formatter(
+                formatter,
+                color_system=color_system,
+                force_jupyter=force_jupyter,
+                background=background,
+            )
+        )
+        return
+    use_jupyter_fonts()
     session.rich_add_vspace = False
     session.use_rich = True
     if formatter == "jupyter":
         set_formatter(rich_formatters.jupyter)
+    elif formatter in ["notebook", "notebook-dark"]:
+        # Html with css classes, without Rich.
+        if formatter == "notebook-dark":
+            rich_formatters.NOTEBOOK_STYLE = "friendly_dark"
+        else:
+            rich_formatters.NOTEBOOK_STYLE = "friendly_light"
+        set_formatter(rich_formatters.notebook)
     else:
         old_set_formatter(
             formatter=formatter,
@@ -78,14 +104,13 @@ def set_tb_width(width=None):
     _ = current_lang.translate
     if width is None:
         return
-    try:
-        session.console.width = width
-    except Exception:
+    if not (session.use_rich or hasattr(session.formatter, "deferred")):
         print(_("set_width() has no effect with this formatter."))
         return
+    # The console is not changed: tracebacks are rendered at this width.
     session.rich_tb_width = width
     if session.rich_width is None or session.rich_width > session.rich_tb_width:
-        session.rich_width = width
+        set_width(width)  # noqa
 
 
 setattr(Friendly, "set_tb_width", set_tb_width)  # noqa
@@ -93,9 +118,10 @@ helpers["set_tb_width"] = set_tb_width
 
 __all__ = list(helpers.keys())
 
-# Use the new interactive light formatter by default.
+# Use the new interactive light formatter by default; Rich and its
+# console are only needed, and set up, when the first traceback is shown.
 
-light()  # noqa
+set_formatter("interactive", lazy=True)  # noqa
 set_tb_width(100)  # noqa
 set_width(70)  # noqa
 session.is_jupyter = True
@@ -0,0 +1,176 @@
+"""
+metrics.py
+==========
+
+Lightweight counters and latency histograms for the formatting pipeline,
+intended to monitor the cost of friendly in long-running processes.
+
+Metrics are disabled by default; they can be enabled with ``enable()``,
+by the ``stats()`` console helper, or by setting the environment
+variable ``FRIENDLY_METRICS`` to a non-empty value.
+When disabled, the instrumented functions only incur the cost of
+checking a single global variable.
+"""
+import functools
+import inspect
+import os
+import threading
+import time
+
+ENABLED = bool(os.environ.get("FRIENDLY_METRICS"))  # not a constant
+
+# Upper bounds, in seconds, of the histogram buckets.
+BUCKETS = (0.001, 0.0025, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0)
+
+_lock = threading.Lock()
+_counters = {}
+_timings = {}
+
+
+def enable():
+    """Starts recording metrics."""
+    global ENABLED
+    ENABLED = True
+
+
+def disable():
+    """Stops recording metrics; the values already recorded are kept."""
+    global ENABLED
+    ENABLED = False
+
+
+def reset():
+    """Removes all the values recorded."""
+    with _lock:
+        _counters.clear()
+        _timings.clear()
+
+
+def increment(name, value=1):
+    """Increments a counter."""
+    if not ENABLED:
+        return
+    with _lock:
+        _counters[name] = _counters.get(name, 0) + value
+
+
+def count_written(text):
+    """Adds the size, in bytes, of some text written to "bytes_written"."""
+    if not ENABLED:
+        return
+    increment("bytes_written", len(text.encode("utf8")))
+
+
+def written_text(result):
+    """Returns the text written for the result of a formatter: either
+    a string, or a list of strings and of (text, tag) pairs as written
+    by IDLE's formatter."""
+    if isinstance(result, str):
+        return result
+    if isinstance(result, list):
+        return "".join(
+            part if isinstance(part, str) else part[0] for part in result
+        )
+    return ""
+
+
+def observe(name, duration):
+    """Records the duration, in seconds, of a single call."""
+    if not ENABLED:
+        return
+    with _lock:
+        if name not in _timings:
+            _timings[name] = {
+                "count": 0,
+                "total": 0.0,
+                "max": 0.0,
+                "buckets": [0] * (len(BUCKETS) + 1),
+            }
+        timing = _timings[name]
+        timing["count"] += 1
+        timing["total"] += duration
+        timing["max"] = max(timing["max"], duration)
+        for index, bound in enumerate(BUCKETS):
+            if duration <= bound:
+                break
+        else:
+            index = len(BUCKETS)
+        timing["buckets"][index] += 1
+
+
+def timed(name):
+    """Decorator recording the time spent in a function."""
+
+    def decorator(function):
+        @functools.wraps(function)
+        def wrapper(*args, **kwargs):
+            if not ENABLED:
+                return function(*args, **kwargs)
+            start = time.perf_counter()
+            try:
+                return function(*args, **kwargs)
+            finally:
+                observe(name, time.perf_counter() - start)
+
+        return wrapper
+
+    return decorator
+
+
+def counted_formatter(name, rendered=False):
+    """Decorator for formatters, recording the number of exceptions
+    formatted for each value of include, the time spent, and the size
+    of the text written.
+
+    The text returned is written as is, unless rendered is True: it is
+    then laid out by rich_writer(), which counts what it writes, as do
+    the Jupyter formatters which display html directly.
+    """
+
+    def decorator(formatter):
+        # Only used to record the value of include; the arguments are
+        # passed unchanged, so that each formatter keeps its own default.
+        default_include = inspect.signature(formatter).parameters["include"].default
+
+        @functools.wraps(formatter)
+        def wrapper(*args, **kwargs):
+            if not ENABLED:
+                return formatter(*args, **kwargs)
+            start = time.perf_counter()
+            try:
+                result = formatter(*args, **kwargs)
+            finally:
+                observe(name, time.perf_counter() - start)
+            if "include" in kwargs:
+                include = kwargs["include"]
+            elif len(args) > 1:
+                include = args[1]
+            else:
+                include = default_include
+            increment(f"formatted.{name}.{include}")
+            if not rendered:
+                count_written(written_text(result))
+            return result
+
+        return wrapper
+
+    return decorator
+
+
+def get_stats():
+    """Returns the values recorded as a dict, with times in seconds."""
+    with _lock:
+        timings = {}
+        for name, timing in _timings.items():
+            buckets = {
+                str(bound): count for bound, count in zip(BUCKETS, timing["buckets"])
+            }
+            buckets["inf"] = timing["buckets"][-1]
+            timings[name] = {
+                "count": timing["count"],
+                "total": timing["total"],
+                "mean": timing["total"] / timing["count"],
+                "max": timing["max"],
+                "buckets": buckets,
+            }
+        return {"enabled": ENABLED, "counters": dict(_counters), "timings": timings}
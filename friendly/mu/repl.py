@@ -13,10 +13,9 @@ from friendly.ipython import *  # noqa  # Will automatically install
 
 old_set_width = set_width  # noqa
 from friendly import set_formatter as old_set_formatter
+from friendly import defer_formatter
 from friendly.rich_console_helpers import FriendlyHelpers, helpers
 
-
-from friendly import theme
 from friendly import rich_formatters
 
 colorama.deinit()  # reset needed on Windows
@@ -28,11 +27,16 @@ del helpers["dark"]
 del helpers["light"]
 
 
-def set_formatter(formatter=None, background=None):
+def set_formatter(formatter=None, background=None, lazy=False):
     """Sets the default formatter. If no argument is given, a default
     formatter is used.
     """
+    if lazy:
+        defer_formatter(lambda: set_formatter(formatter, background=background))
+        return
     if formatter in ["black", "day", "night"]:
+        from friendly import theme
+
         style = "light" if formatter == "day" else "dark"
         session.console = theme.init_rich_console(
             style=style,
@@ -59,7 +63,9 @@ helpers["set_formatter"] = set_formatter
 
 def set_width(width=80):
     """Sets the width in a iPython/Jupyter session using 'light' or 'dark' mode"""
-    if session.use_rich:
+    if hasattr(session.formatter, "deferred"):
+        session.rich_width = width  # applied when the console is created
+    elif session.use_rich:
         session.console._width = width
     else:
         print(_("set_width() is only available using 'day', 'night' or 'black' mode."))
@@ -106,4 +112,5 @@ Friendly = FriendlyHelpers(local_helpers=local_helpers)
 helpers["Friendly"] = Friendly
 helpers.update(local_helpers)
 __all__ = list(helpers.keys())
-day()
+# The console for the day theme is only created when first needed.
+defer_formatter(day)
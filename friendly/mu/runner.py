@@ -3,6 +3,7 @@ into a console that does not support colour.
 """
 import sys  # noqa
 from ..my_gettext import current_lang  # noqa
+from ..sink import BufferedSink
 
 from friendly_traceback.runtime_errors import name_error
 from friendly_traceback import run, start_console, install  # noqa
@@ -21,4 +22,6 @@ for name in ("bw", "day", "night", "black"):
 
 __all__.append("run")
 __all__.append("start_console")
-install(redirect=sys.stderr.write, include="friendly_tb")
+# Each explanation is written to stderr with a single call, so that it
+# is not split when received by Mu.
+install(redirect=BufferedSink(sys.stderr.write), include="friendly_tb")
@@ -18,64 +18,148 @@ provide a translation, we define locally _ to be
 
 where current_lang.translate means gettext.translation().gettext where
 gettext.translation() is the class-based API for gettext.
+
+Since a single language is used by default in a given process, while some
+programs, such as web services, need to provide explanations in different
+languages at the same time, a language can also be chosen for the current
+context (thread or asyncio task) only, using
+
+    with language("fr"):
+        ...
+
+This applies to the translations done by friendly_traceback as well.
+Catalogs are loaded only once for each language.
 """
 
+import contextlib
 import gettext
 import os
+import threading
+from contextvars import ContextVar
 
 from friendly_traceback import debug_helper
+from friendly_traceback import ft_gettext
+
+LOCALEDIR = os.path.normpath(os.path.join(os.path.dirname(__file__), "locales"))
+FT_LOCALEDIR = os.path.normpath(
+    os.path.join(os.path.dirname(ft_gettext.__file__), "locales")
+)
+
+_context_lang = ContextVar("friendly_lang", default=None)
+_catalogs = {}
+_catalogs_lock = threading.Lock()
+
+
+def get_catalog(localedir, lang):
+    """Returns the language actually used when ``lang`` is requested,
+    and the corresponding translation function; these are cached."""
+    key = (localedir, lang)
+    if key in _catalogs:
+        return _catalogs[key]
+    try:
+        # We first look for the exact language requested.
+        _lang = gettext.translation(
+            "friendly", localedir=localedir, languages=[lang], fallback=False
+        )
+        found = lang
+    except FileNotFoundError:
+        # If it is not available, we make it possible to replace a
+        # language specific to a region, as in fr_CA, by a more
+        # generic version, such as fr, defined by a two-letter code.
+        found = lang[:2]
+        _lang = gettext.translation(
+            "friendly",
+            localedir=localedir,
+            languages=[found],
+            fallback=True,  # This means that the hard-coded strings in
+            # the source file will be used if the requested language
+            # is not available.
+        )
+    with _catalogs_lock:
+        _catalogs[key] = (found, _lang.gettext)
+    return _catalogs[key]
+
+
+def translate_with(translate, lang, text):
+    translation = translate(text)
+    if lang == "en":
+        return translation
+    if translation == text:  # pragma: no cover
+        debug_helper.log(f"Potentially untranslated text for {lang}:")
+        debug_helper.log(text)
+    return translation
 
 
 class LangState:
-    def __init__(self):
+    def __init__(self, localedir=LOCALEDIR):
+        self.localedir = localedir
         self._translate = lambda text: text
-        self.lang = "en"
+        self._lang = "en"
+
+    @property
+    def lang(self):
+        """The language used in the current context."""
+        lang = _context_lang.get()
+        if lang is None:
+            return self._lang
+        return get_catalog(self.localedir, lang)[0]
 
     def install(self, lang=None):
-        """Sets the language to be used for translations"""
+        """Sets the language to be used for translations, except in
+        contexts where another one has been chosen with language()."""
         if lang is None:
             lang = "en"
-        try:
-            # We first look for the exact language requested.
-            _lang = gettext.translation(
-                "friendly",
-                localedir=os.path.normpath(
-                    os.path.join(os.path.dirname(__file__), "locales")
-                ),
-                languages=[lang],
-                fallback=False,
-            )
-        except FileNotFoundError:
-            # If it is not available, we make it possible to replace a
-            # language specific to a region, as in fr_CA, by a more
-            # generic version, such as fr, defined by a two-letter code.
-            lang = lang[:2]
-            _lang = gettext.translation(
-                "friendly",
-                localedir=os.path.normpath(
-                    os.path.join(os.path.dirname(__file__), "locales")
-                ),
-                languages=[lang],
-                fallback=True,  # This means that the hard-coded strings in
-                # the source file will be used if the requested language
-                # is not available.
-            )
-        self.lang = lang
-        self._translate = _lang.gettext
+        self._lang, self._translate = get_catalog(self.localedir, lang)
 
     def translate(self, text):
-        translation = self._translate(text)
-        if self.lang == "en":
-            return translation
-        if translation == text:  # pragma: no cover
-            debug_helper.log(f"Potentially untranslated text for {self.lang}:")
-            debug_helper.log(text)
-        return translation
+        lang = _context_lang.get()
+        if lang is None:
+            return translate_with(self._translate, self._lang, text)
+        lang, _translate = get_catalog(self.localedir, lang)
+        return translate_with(_translate, lang, text)
 
 
 current_lang = LangState()  # noqa
 
 
+def follow_context(lang_state, localedir):
+    """Makes the translations done with an instance of friendly_traceback's
+    own LangState use the language chosen for the current context, if any."""
+    global_translate = lang_state.translate
+
+    def translate(text):
+        lang = _context_lang.get()
+        if lang is None:
+            return global_translate(text)
+        lang, _translate = get_catalog(localedir, lang)
+        return translate_with(_translate, lang, text)
+
+    lang_state.translate = translate
+
+
+follow_context(ft_gettext.current_lang, FT_LOCALEDIR)
+
+
+@contextlib.contextmanager
+def language(lang):
+    """Context manager using ``lang`` for the translations done in
+    the current context (thread or asyncio task) only."""
+    token = _context_lang.set(lang)
+    try:
+        yield
+    finally:
+        _context_lang.reset(token)
+
+
+def info_lang(info):
+    """Returns the language of the information about an exception.
+    friendly-traceback records its process-wide language in info["lang"],
+    even when the information was obtained within language()."""
+    if _context_lang.get() is not None:
+        return current_lang.lang
+    return info.get("lang") or current_lang.lang
+
+
 # Todo: replace localized messages about new cases by the function below
 # which will do the logging automatically.
 
@@ -0,0 +1,169 @@
+"""
+renderer.py
+===========
+
+Rendering of the information about an exception as a string, instead of
+writing it to a stream or displaying it in a notebook. This is intended
+for programs, such as web services, which need to include the output
+of friendly in their own.
+
+The Rich consoles used are created once for each style, and are not used
+to print anything; they can thus be shared by different threads.
+This is used by render_async(), for asyncio programs, which renders
+exceptions in a small pool of threads so as not to block the event loop.
+"""
+import asyncio
+import concurrent.futures
+import contextvars
+import functools
+import io
+import threading
+
+from friendly_traceback import core
+from friendly_traceback.base_formatters import repl
+
+from . import rich_formatters
+from .my_gettext import current_lang, language
+
+# Formatters whose output does not depend on the output kind.
+TEXT_FORMATTERS = {
+    "repl": repl,
+    "markdown": rich_formatters.markdown,
+    "docs": rich_formatters.markdown_docs,
+    "json": rich_formatters.json,
+    "html": rich_formatters.html,
+}
+RICH_STYLES = ["dark", "light"]
+OUTPUTS = ["ansi", "text", "html"]
+MAX_WORKERS = 4  # not a constant; threads used by render_async()
+
+_consoles = {}
+_syntax_themes = {}
+_lock = threading.Lock()
+_executor = None
+
+
+def get_info(exception, lang=None):
+    """Returns the information obtained by friendly-traceback
+    for an exception, in the language specified if any.
+
+    The language is only changed for the current context, so that
+    exceptions can be rendered in different languages concurrently."""
+    with language(lang or current_lang.lang):
+        tb_info = core.FriendlyTraceback(
+            type(exception), exception, exception.__traceback__
+        )
+        tb_info.compile_info()
+        info = tb_info.info
+        info["lang"] = current_lang.lang
+    return info
+
+
+def get_console(style):
+    """Returns a Rich console, and the corresponding syntax theme,
+    used only for rendering with a given style."""
+    with _lock:
+        if style not in _consoles:
+            from friendly.theme import friendly_rich
+
+            if style == "light":
+                rich_theme = friendly_rich.light_background_theme
+                pygments_style = friendly_rich.friendly_light
+            else:
+                rich_theme = friendly_rich.dark_background_theme
+                pygments_style = friendly_rich.friendly_dark
+            _consoles[style] = friendly_rich.Console(
+                theme=rich_theme,
+                color_system="truecolor",
+                force_terminal=True,
+                force_jupyter=False,
+                file=io.StringIO(),
+            )
+            _syntax_themes[style] = friendly_rich.PygmentsSyntaxTheme(pygments_style)
+        return _consoles[style], _syntax_themes[style]
+
+
+def segments_to_ansi(segments):
+    """Converts Rich segments into text with ANSI escape sequences."""
+    from rich.segment import Segment
+
+    return "".join(
+        style.render(text) if style else text
+        for text, style, control in Segment.simplify(segments)
+        if not control
+    )
+
+
+def render(
+    exception,
+    formatter="dark",
+    include="friendly_tb",
+    lang=None,
+    width=80,
+    output="ansi",
+):
+    """Returns the information about an exception, or a dict of
+    information already obtained, formatted as a string.
+
+    See friendly.render() for a description of the arguments.
+    """
+    if formatter not in TEXT_FORMATTERS and formatter not in RICH_STYLES:
+        raise ValueError(f"Unknown formatter: {formatter}")
+    if output not in OUTPUTS:
+        raise ValueError(f"Unknown output: {output}")
+    if isinstance(exception, BaseException):
+        info = get_info(exception, lang=lang)
+    else:
+        info = exception
+
+    # Formatters translate some headings themselves.
+    with language(info.get("lang") or current_lang.lang):
+        if formatter in TEXT_FORMATTERS:
+            return TEXT_FORMATTERS[formatter](info, include=include)
+        text = rich_formatters.rich_markdown(info, include=include)
+
+    # Only the header chosen by the formatter is used, not the traceback
+    # width which is specific to Jupyter.
+    state = rich_formatters.pop_render_state()
+    console, syntax_theme = get_console(formatter)
+    lines = rich_formatters.render_lines(
+        text,
+        header=state.get("header", False),
+        width=width,
+        console=console,
+        syntax_theme=syntax_theme,
+    )
+    segments = [segment for line in lines for segment in line]
+    if output == "ansi":
+        return segments_to_ansi(segments)
+    if output == "html":
+        return rich_formatters.segments_to_html(segments)
+    return "".join(text for text, _style, control in segments if not control)
+
+
+def get_executor():
+    """Returns the pool of threads used by render_async()."""
+    global _executor
+    with _lock:
+        if _executor is None:
+            _executor = concurrent.futures.ThreadPoolExecutor(
+                max_workers=MAX_WORKERS, thread_name_prefix="friendly-render"
+            )
+        return _executor
+
+
+async def render_async(exception, timeout=None, **kwargs):
+    """Same as render(), but done in a thread of a bounded pool.
+
+    The context, including the language chosen with language(), is
+    copied to the thread. If the call is cancelled, or if ``timeout``
+    (in seconds) is exceeded, a rendering not yet started is dropped;
+    one already started cannot be interrupted, but its result is discarded.
+    """
+    # get_running_loop() is not available in Python 3.6.
+    loop = getattr(asyncio, "get_running_loop", asyncio.get_event_loop)()
+    context = contextvars.copy_context()
+    future = loop.run_in_executor(
+        get_executor(), functools.partial(context.run, render, exception, **kwargs)
+    )
+    return await asyncio.wait_for(future, timeout)
@@ -0,0 +1,140 @@
+"""
+repeats.py
+==========
+
+When a loop, or a cell that is run again and again, raises the same
+exception many times, analysing and rendering each occurrence in full
+floods the output and can take a noticeable amount of time.
+
+When enabled, this module recognises an exception identical, by its type,
+message and location, to a recent one; only the first occurrence is
+analysed and shown in full, later ones being shown as a single line
+with the number of occurrences. Furthermore, the number of exceptions
+analysed and shown in full is limited for each second; additional ones
+are only shown as a single line including the error message.
+
+Since repeated exceptions are not analysed, ``what()``, ``why()``, etc.,
+refer to their first occurrence.
+"""
+import collections
+import linecache
+import sys
+import time
+
+from friendly_traceback.config import session
+
+from .my_gettext import current_lang
+
+WINDOW = 60  # not a constant; seconds during which an exception is recent
+MAX_PER_SECOND = 5  # not a constant; exceptions shown in full
+MAX_RECENT = 20  # not a constant; number of recent exceptions remembered
+
+_original_hook = None
+_recent = collections.OrderedDict()  # key: [count, time of last occurrence]
+_shown = collections.deque()  # times at which exceptions were shown in full
+
+
+def is_enabled():
+    return _original_hook is not None
+
+
+def enable(window=None, max_per_second=None):
+    """Starts recognising repeated exceptions. A value of 0 for
+    max_per_second removes the limit on exceptions shown in full."""
+    global _original_hook, WINDOW, MAX_PER_SECOND
+    if window is not None:
+        WINDOW = window
+    if max_per_second is not None:
+        MAX_PER_SECOND = max_per_second or None
+    if is_enabled():
+        return
+    # session.exception_hook is used by explain_traceback() and,
+    # once friendly is installed, as sys.excepthook.
+    _original_hook = session.exception_hook
+    session.exception_hook = exception_hook
+    if sys.excepthook == _original_hook:
+        sys.excepthook = exception_hook
+
+
+def disable():
+    """Shows every exception in full again."""
+    global _original_hook
+    if not is_enabled():
+        return
+    if sys.excepthook == exception_hook:
+        sys.excepthook = _original_hook
+    del session.exception_hook  # the method of the class is used again
+    _original_hook = None
+    _recent.clear()
+    _shown.clear()
+
+
+def get_key(etype, value, tb):
+    """Identifies an exception by its type, message and location.
+    The location is given by the name of the function and the content
+    of the line where the exception was raised, rather than by a file name,
+    since each input in a console or IPython is given a different name."""
+    if issubclass(etype, SyntaxError):
+        location = (value.lineno, value.text)
+    elif tb is not None:
+        while tb.tb_next is not None:
+            tb = tb.tb_next
+        code = tb.tb_frame.f_code
+        line = linecache.getline(code.co_filename, tb.tb_lineno).strip()
+        location = (code.co_name, tb.tb_lineno, line)
+    else:
+        location = None
+    return etype.__name__, str(value), location
+
+
+def exception_hook(etype, value, tb, redirect=None):
+    """Replacement of session.exception_hook, showing repeated exceptions,
+    and exceptions over the limit per second, as a single line."""
+    _ = current_lang.translate
+    if etype.__name__ in ("SystemExit", "KeyboardInterrupt"):
+        return _original_hook(etype, value, tb, redirect=redirect)
+
+    now = time.monotonic()
+    for key in list(_recent):
+        if now - _recent[key][1] > WINDOW:
+            del _recent[key]
+    key = get_key(etype, value, tb)
+    message = f"{etype.__name__}: {value}"
+    if key in _recent:
+        _recent[key][0] += 1
+        _recent[key][1] = now
+        _recent.move_to_end(key)
+        text = _("{message} -- same as before (×{count})").format(
+            message=message, count=_recent[key][0]
+        )
+        write(text + "\n", redirect)
+        return
+
+    while _shown and now - _shown[0] > 1:
+        _shown.popleft()
+    if MAX_PER_SECOND is not None and len(_shown) >= MAX_PER_SECOND:
+        text = _("{message} -- not analysed: too many exceptions").format(
+            message=message
+        )
+        write(text + "\n", redirect)
+        return
+
+    _shown.append(now)
+    _recent[key] = [1, now]
+    if len(_recent) > MAX_RECENT:
+        _recent.popitem(last=False)
+    _original_hook(etype, value, tb, redirect=redirect)
+
+
+def write(text, redirect=None):
+    """Writes some text to the current stream, or to the one given
+    by redirect for this call only, like session.exception_hook does."""
+    if redirect is None:
+        session.write_err(text)
+        return
+    saved_write_err = session.write_err
+    session.set_redirect(redirect=redirect)
+    try:
+        session.write_err(text)
+    finally:
+        session.write_err = saved_write_err
@@ -13,6 +13,7 @@ from friendly_traceback.config import session
 
 from friendly.my_gettext import current_lang
 from friendly import set_formatter
+from friendly import code_cache, metrics, repeats, truncate
 
 _ = current_lang.translate
 
@@ -70,11 +71,13 @@ def light():
 
 def set_width(width=80):
     """Sets the width in a iPython/Jupyter session using 'light' or 'dark' mode"""
-    try:
-        session.console.width = width
-    except Exception:
-        print(_("set_width() has no effect with this formatter."))
-        return
+    if not hasattr(session.formatter, "deferred"):
+        try:
+            session.console.width = width
+        except Exception:
+            print(_("set_width() has no effect with this formatter."))
+            return
+    # Otherwise, the width is applied when the console is created.
     session.rich_width = width
     if session.is_jupyter:
         if (
@@ -84,11 +87,76 @@ def set_width(width=80):
             session.rich_tb_width = width
 
 
+def set_limits(characters=None, lines=None, columns=None):
+    """Sets the maximum number of characters for each item shown,
+    of lines for each block of code or text, and of characters on
+    a single line. A value of 0 removes the corresponding limit.
+    If no argument is given, the current limits are shown.
+    """
+    if characters is None and lines is None and columns is None:
+        print(truncate.get_limits())
+        return
+    truncate.set_limits(characters=characters, lines=lines, columns=columns)
+
+
+def stats(enable=None):
+    """Returns a dict containing the metrics recorded for the formatting
+    of exceptions. Use ``stats(True)`` to start recording them,
+    and ``stats(False)`` to stop.
+    """
+    if enable is not None:
+        if enable:
+            metrics.enable()
+        else:
+            metrics.disable()
+    return metrics.get_stats()
+
+
+def hide_repeats(enable=True, max_per_second=None):
+    """Shows an exception identical to a recent one as a single line,
+    and limits the number of exceptions shown in full each second.
+    Use ``hide_repeats(False)`` to show every exception in full again.
+    """
+    if enable:
+        repeats.enable(max_per_second=max_per_second)
+    else:
+        repeats.disable()
+
+
+def code_blocks(blocks=None, size=None):
+    """Shows the number of code blocks entered in the console which are
+    kept, and the memory they use. ``blocks`` and ``size`` (in characters)
+    change the limits; a value of 0 removes the corresponding limit.
+    """
+    if blocks is not None or size is not None:
+        code_cache.set_limits(blocks=blocks, size=size)
+    usage = code_cache.get_usage()
+    print(
+        _(
+            "{blocks} code blocks kept ({characters} characters, "
+            "about {kib:.1f} KiB); limits: {max_blocks} blocks, "
+            "{max_size} characters."
+        ).format(kib=usage["bytes"] / 1024, **usage)
+    )
+
+
 dark.help = lambda: _("Sets a colour scheme designed for a black background.")
 light.help = lambda: _("Sets a colour scheme designed for a white background.")
 set_width.help = lambda: _("Sets the output width in some modes.")
-
-local_helpers = {"dark": dark, "light": light, "set_width": set_width}
+set_limits.help = lambda: _("Sets limits on the size of the information shown.")
+stats.help = lambda: _("Shows the metrics recorded for the formatting of exceptions.")
+hide_repeats.help = lambda: _("Shows repeated exceptions as a single line.")
+code_blocks.help = lambda: _("Shows the memory used by the code blocks kept.")
+
+local_helpers = {
+    "dark": dark,
+    "light": light,
+    "set_width": set_width,
+    "set_limits": set_limits,
+    "stats": stats,
+    "hide_repeats": hide_repeats,
+    "code_blocks": code_blocks,
+}
 add_rich_repr(local_helpers)
 
 for helper in local_helpers:
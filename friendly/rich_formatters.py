@@ -19,89 +19,107 @@ This module currently contains the following formatters
 * ``rich_markdown()``: This produces an output formatted with markdown syntax,
     with some modification, with the end result intended to be printed
     in colour in a console using Rich (https://github.com/willmcgugan/rich).
+
+* ``json()``: This produces a JSON object, intended to be processed by other
+    programs. It does not require Rich, pygments or IPython.
+
+* ``html()``: This produces a complete html document, using pygments
+    for syntax highlighting, which does not require IPython.
 """
-from .my_gettext import current_lang
+import collections
+import itertools
+import threading
+from contextvars import ContextVar
+from importlib.util import find_spec
+from json import dumps
+
+from . import disk_cache, metrics
+from .my_gettext import current_lang, info_lang
 from friendly_traceback.base_formatters import no_result, repl, select_items
 from friendly_traceback.config import session
 from friendly_traceback.typing import InclusionChoice, Info
-from friendly import theme
-
-from pygments import highlight  # noqa
-from pygments.lexers import PythonLexer, PythonTracebackLexer  # noqa
-from pygments.formatters import HtmlFormatter  # noqa
-
-from rich import jupyter as rich_jupyter
-
-ipython_available = False
-try:  # pragma: no cover
-
-    from IPython.display import display, HTML  # noqa
-
-    ipython_available = True
-except ImportError:
-    display = HTML = lambda x: x
-
-RICH_HEADER = False  # not a constant
-WIDE_OUTPUT = False  # not a constant
-COUNT = 0  # not a constant
-
-
+from .truncate import truncate_info
+
+# Rich, pygments and IPython are only imported by the formatters that
+# need them, so that formatters like json() can be used in environments
+# where these are either unavailable or too costly to import.
+ipython_available = find_spec("IPython") is not None
+
+HTML_STYLE = "friendly_light"  # not a constant
+HTML_STYLESHEET = None  # not a constant
+# Style used by the notebook() formatter, and the scoped stylesheets
+# already obtained for each style.
+NOTEBOOK_STYLE = "friendly_light"  # not a constant
+_notebook_stylesheets = {}
+# Format of the html used to show Rich's output in Jupyter; if None,
+# the format defined by Rich is used.
+JUPYTER_HTML_FORMAT = None  # not a constant
+
+# Information about the current render, from a formatter to rich_writer()
+# which writes its output: whether to add a header and the width to use.
+# Using a context variable instead of global variables allows exceptions
+# to be formatted at the same time in different threads.
+_render_state = ContextVar("friendly_render_state", default=None)
+# Used to give unique ids to html elements with jupyter_interactive().
+_counter = itertools.count(1)
+
+# Rendered markdown, for each width; see render_lines().
+LAYOUT_CACHE_SIZE = 64  # not a constant
+_layout_cache = collections.OrderedDict()
+_layout_lock = threading.Lock()
+
+
+@metrics.counted_formatter("jupyter_interactive")
 def jupyter_interactive(info: Info, include: InclusionChoice = "friendly_tb") -> str:  # noqa
     """This implements a formatter that inserts buttons in a jupyter notebook
     allowing to selectively show what/why/where, instead of
     showing the friendly_tb by default."""
-    global COUNT
     if include != "friendly_tb":
         text = _markdown(info, include=include, rich=True)
         rich_writer(text)
         return
-    COUNT += 1
+    count = next(_counter)
     _ = current_lang.translate
     session.rich_add_vspace = False
-    add_message(info, count=COUNT)
-    add_control(count=COUNT)
-    add_friendly_tb(info, count=COUNT)
-    add_interactive_item(info, "what", count=COUNT)
-    add_interactive_item(info, "why", count=COUNT)
-    add_interactive_item(info, "where", count=COUNT)
+    add_message(info, count=count)
+    add_control(count=count)
+    add_friendly_tb(info, count=count)
+    add_interactive_item(info, "what", count=count)
+    add_interactive_item(info, "why", count=count)
+    add_interactive_item(info, "where", count=count)
     return ""
 
 
 def add_message(info: Info, count: int = -1) -> None:
     """Shows the error message. By default, this is the only item shown
     other than a button to reveal"""
-    old_jupyter_html_format = rich_jupyter.JUPYTER_HTML_FORMAT
-    rich_jupyter.JUPYTER_HTML_FORMAT = (
+    html_format = (
         "<div id='friendly-message{count}'>".format(count=count)
-        + old_jupyter_html_format
+        + jupyter_html_format()
         + "</div>"
     )
     text = _markdown(info, include="message", rich=True)
-    rich_writer(text)
-    rich_jupyter.JUPYTER_HTML_FORMAT = old_jupyter_html_format
+    rich_writer(text, html_format=html_format)
 
 
 def add_friendly_tb(info: Info, count: int = -1) -> None:
     """Adds the friendly_tb, hidden by default"""
-    old_jupyter_html_format = rich_jupyter.JUPYTER_HTML_FORMAT
     name = "friendly_tb"
-    rich_jupyter.JUPYTER_HTML_FORMAT = (
+    html_format = (
         "<div id='friendly-tb-{name}-content{count}' style='display:none'>".format(
             name=name, count=count
         )
-        + old_jupyter_html_format
+        + jupyter_html_format()
         + "</div>"
     )
     text = _markdown(info, include="friendly_tb", rich=True)
-    rich_writer(text)
-    rich_jupyter.JUPYTER_HTML_FORMAT = old_jupyter_html_format
+    rich_writer(text, html_format=html_format)
 
 
 def add_interactive_item(info: Info, name: InclusionChoice, count: int = -1) -> None:
     """Adds interactive items (what/why/where) with buttons to toggle
     their visibility."""
     _ = current_lang.translate
-    old_jupyter_html_format = rich_jupyter.JUPYTER_HTML_FORMAT
 
     content = """<script type="text/Javascript"> function toggle_{name}{count}(){{
      var content = document.getElementById('friendly-tb-{name}-content{count}');
@@ -121,19 +139,17 @@ def add_interactive_item(info: Info, name: InclusionChoice, count: int = -1) ->
     """.format(
         name=name, count=count, hide=_("Hide"), btn_style=session.jupyter_button_style
     )
-    display(HTML(content))
+    display_html(content)
 
-    rich_jupyter.JUPYTER_HTML_FORMAT = (
+    html_format = (
         "<div id='friendly-tb-{name}-content{count}' style='display:none'>".format(
             name=name, count=count
         )
-        + old_jupyter_html_format
+        + jupyter_html_format()
         + "</div>"
     )
     text = _markdown(info, include=name, rich=True)
-    rich_writer(text)
-
-    rich_jupyter.JUPYTER_HTML_FORMAT = old_jupyter_html_format
+    rich_writer(text, html_format=html_format)
 
 
 def add_control(count: int = -1) -> None:
@@ -183,25 +199,187 @@ def add_control(count: int = -1) -> None:
         only=_("Show message only"),
         btn_style=session.jupyter_button_style,
     )
+    display_html(content)
+
+
+def display_html(content: str) -> None:  # pragma: no cover
+    """Displays some html content in a Jupyter notebook or equivalent.
+    Does nothing if IPython is not available."""
+    if not ipython_available:
+        return
+    from IPython.display import display, HTML  # noqa
+
+    metrics.count_written(content)
     display(HTML(content))
 
 
-def rich_writer(text: str) -> None:  # pragma: no cover
-    """Default writer"""
-    global RICH_HEADER, WIDE_OUTPUT
-    if session.rich_add_vspace:
-        session.console.print()
-    md = theme.friendly_rich.Markdown(
-        text, inline_code_lexer="python", code_theme=theme.CURRENT_THEME
-    )
-    if RICH_HEADER:
-        title = "Traceback"
-        md = theme.friendly_rich.Panel(md, title=title)
-        RICH_HEADER = False
-    session.console.print(md)
-    if WIDE_OUTPUT:
-        session.console.width = session.rich_width
-        WIDE_OUTPUT = False
+def pop_render_state() -> dict:
+    """Returns the information about the current render given by the
+    formatter, and removes it so that it is not used for the next one."""
+    state = _render_state.get() or {}
+    _render_state.set(None)
+    return state
+
+
+def jupyter_html_format() -> str:  # pragma: no cover
+    """Returns the format of the html used to show Rich's output in Jupyter."""
+    if JUPYTER_HTML_FORMAT is not None:
+        return JUPYTER_HTML_FORMAT
+    from rich import jupyter as rich_jupyter
+
+    return rich_jupyter.JUPYTER_HTML_FORMAT
+
+
+def segments_to_html(segments, html_format: str = None) -> str:  # pragma: no cover
+    """Converts Rich segments to html, like Rich does for Jupyter,
+    but using the format given instead of a global variable."""
+    from rich.segment import Segment
+    from rich.terminal_theme import DEFAULT_TERMINAL_THEME
+
+    fragments = []
+    for text, style, control in Segment.simplify(segments):
+        if control:
+            continue
+        text = text.replace("&", "&amp;").replace("<", "&lt;").replace(">", "&gt;")
+        if style:
+            rule = style.get_html_style(DEFAULT_TERMINAL_THEME)
+            text = f'<span style="{rule}">{text}</span>' if rule else text
+            if style.link:
+                text = f'<a href="{style.link}">{text}</a>'
+        fragments.append(text)
+    html_format = html_format or jupyter_html_format()
+    return html_format.format(code="".join(fragments))
+
+
+def render_lines(
+    text: str,
+    header: bool = False,
+    width: int = None,
+    console=None,
+    syntax_theme=None,
+) -> list:  # pragma: no cover
+    """Renders some markdown text with a Rich console, by default
+    session.console, at the width given or at the width of the console,
+    and returns the lines of Rich segments obtained.
+    The console itself is not modified.
+
+    Since the same exception is often shown at different widths, or shown
+    again, the results are kept in a cache for each width.
+    """
+    from friendly import theme
+
+    console = console or session.console
+    syntax_theme = syntax_theme or theme.CURRENT_SYNTAX_THEME
+    width = width or console.width
+    key = (text, header, width, syntax_theme)
+    with _layout_lock:
+        cached = _layout_cache.get(key)
+        if cached is not None and cached[0] is console:
+            _layout_cache.move_to_end(key)
+            metrics.increment("cache_hits.layout")
+            return cached[1]
+    metrics.increment("cache_misses.layout")
+
+    options = console.options.update(width=width)
+    stored = disk_key = None
+    if disk_cache.is_enabled():
+        disk_key = disk_cache.make_key(
+            text, header, width, options.ascii_only, theme_key(syntax_theme)
+        )
+        stored = disk_cache.get(disk_key)
+    if stored is not None:
+        metrics.increment("cache_hits.disk")
+        lines = lines_from_json(stored)
+    else:
+        md = theme.friendly_rich.Markdown(
+            text, inline_code_lexer="python", code_theme=syntax_theme
+        )
+        if header:
+            # Rich renders the title using the width of the console; it must
+            # not be cropped if the width used for this render is larger.
+            title = theme.friendly_rich.Text("Traceback", overflow="ignore")
+            md = theme.friendly_rich.Panel(md, title=title)
+        lines = console.render_lines(md, options, pad=False, new_lines=True)
+        if disk_key is not None:
+            disk_cache.put(disk_key, lines_to_json(lines))
+
+    with _layout_lock:
+        _layout_cache[key] = (console, lines)
+        while len(_layout_cache) > LAYOUT_CACHE_SIZE:
+            _layout_cache.popitem(last=False)
+    return lines
+
+
+def theme_key(syntax_theme) -> tuple:
+    """Identifies a syntax theme, and with it the console theme used,
+    by its background colour, which can be changed, and the styles
+    of the main kinds of tokens."""
+    from pygments.token import Comment, Keyword, Name, Number, String, Text
+
+    tokens = (Text, Keyword, Name, Number, String, Comment)
+    return tuple(
+        str(syntax_theme.get_style_for_token(token)) for token in tokens
+    ) + (str(syntax_theme.get_background_style()),)
+
+
+def lines_to_json(lines: list) -> list:
+    """Converts lines of Rich segments so that they can be stored."""
+    return [
+        [[text, str(style) if style else None] for text, style, _control in line]
+        for line in lines
+    ]
+
+
+def lines_from_json(data: list) -> list:
+    from rich.segment import Segment
+    from rich.style import Style
+
+    return [
+        [Segment(text, Style.parse(style) if style else None) for text, style in line]
+        for line in data
+    ]
+
+
+def write_lines(lines: list, html_format: str = None) -> None:  # pragma: no cover
+    """Writes lines of Rich segments using session.console;
+    in Jupyter, the html produced uses html_format if it is specified."""
+    from rich.segment import Segments
+
+    segments = [segment for line in lines for segment in line]
+    if session.console.is_jupyter:
+        display_html(segments_to_html(segments, html_format))
+    else:
+        if metrics.ENABLED:
+            # Terminal escape codes are not included.
+            metrics.count_written("".join(segment.text for segment in segments))
+        session.console.print(Segments(segments), crop=False)
+
+
+@metrics.timed("rich_writer")
+def rich_writer(
+    text: str, html_format: str = None, width: int = None
+) -> None:  # pragma: no cover
+    """Default writer. If width is not specified, the width chosen
+    by the formatter, if any, or that of the console is used."""
+    state = pop_render_state()
+    # A BufferedSink writes the whole explanation at once; a blank line
+    # written after it is written immediately instead.
+    sink = session.console.file
+    buffered = hasattr(sink, "emit") and bool(text.strip())
+    if buffered:
+        sink.hold()
+    try:
+        if session.rich_add_vspace:
+            session.console.print()
+        lines = render_lines(
+            text, header=state.get("header", False), width=width or state.get("width")
+        )
+        write_lines(lines, html_format=html_format)
+    finally:
+        # Otherwise, what is written later would be held until the
+        # next explanation.
+        if buffered:
+            sink.emit()
 
 
 def html_escape(text: str) -> str:  # pragma: no cover
@@ -220,6 +398,7 @@ def html_escape(text: str) -> str:  # pragma: no cover
 # For some reason, moving this to friendly.ipython
 # and trying to import it from there uninstalls everything: it is as though
 # it starts a new iPython subprocess.
+@metrics.counted_formatter("jupyter")
 def jupyter(info: Info, include: InclusionChoice = "friendly_tb") -> str:  # pragma: no cover
     """Jupyter formatter using pygments and html format.
 
@@ -228,10 +407,16 @@ def jupyter(info: Info, include: InclusionChoice = "friendly_tb") -> str:  # pra
     However, some of the information shown may be less than optimal
     when it comes to visibility/contrast.
     """
+    from pygments import highlight  # noqa
+    from pygments.lexers import PythonLexer, PythonTracebackLexer  # noqa
+    from pygments.formatters import HtmlFormatter  # noqa
+    from friendly import theme  # noqa  Monkeypatches PythonTracebackLexer
+
     _ = current_lang.translate
-    css = HtmlFormatter().get_style_defs(".highlight")
-    display(HTML(f"<style>{css}</style>"))  # noqa
+    css = theme.lookup.get_pygments_css("default", ".highlight")
+    display_html(f"<style>{css}</style>")  # noqa
     items_to_show = select_items(include)
+    info = truncate_info(info, items_to_show)
     result = False
     for item in items_to_show:
         if item in info:
@@ -239,11 +424,11 @@ def jupyter(info: Info, include: InclusionChoice = "friendly_tb") -> str:  # pra
             if "source" in item or "variable" in item:
                 text = info[item]
                 text = highlight(text, PythonLexer(), HtmlFormatter())
-                display(HTML(text))
+                display_html(text)
             elif "traceback" in item:
                 text = info[item]
                 text = highlight(text, PythonTracebackLexer(), HtmlFormatter())
-                display(HTML(text))
+                display_html(text)
             elif item == "message":  # format like last line of traceback
                 content = info[item].split(":")
                 error_name = content[0]
@@ -257,27 +442,196 @@ def jupyter(info: Info, include: InclusionChoice = "friendly_tb") -> str:  # pra
                         "</span></pre></div>",
                     ]
                 )
-                display(HTML(text))
+                display_html(text)
             elif item == "suggest":
                 text = html_escape(info[item])
-                display(HTML(f"<p><i>{text}</i></p>"))
+                display_html(f"<p><i>{text}</i></p>")
             else:
                 text = html_escape(info[item])
                 if "header" in item:
-                    display(HTML(f"<p><b>{text}</b></p>"))
+                    display_html(f"<p><b>{text}</b></p>")
                 else:
-                    display(HTML(f'<p style="width: 70ch">{text}</p>'))
+                    display_html(f'<p style="width: 70ch">{text}</p>')
     if not result:
         text = no_result(info, include)
         if text:
-            display(HTML(f'<p style="width: 70ch;">{text}</p>'))
+            display_html(f'<p style="width: 70ch;">{text}</p>')
+    return ""
+
+
+@metrics.counted_formatter("notebook")
+def notebook(info: Info, include: InclusionChoice = "friendly_tb") -> str:  # pragma: no cover
+    """Jupyter formatter writing the information directly as html, with
+    css classes based on the friendly themes, as html_body() does, instead
+    of laying it out with Rich and using inline styles for each span.
+    The output is much smaller, and obtained much faster.
+
+    The stylesheet, which is specific to the style used, is included in
+    each output, so that it remains styled when other outputs are cleared.
+    """
+    style = NOTEBOOK_STYLE
+    if style not in _notebook_stylesheets:
+        scope = f".friendly.{style}"
+        # Rules which pygments does not prefix, such as the one for all
+        # pre elements, would change the rest of the notebook.
+        _notebook_stylesheets[style] = "\n".join(
+            rule
+            for rule in html_stylesheet(style, scope=scope).splitlines()
+            if rule.startswith(scope)
+        )
+    display_html(
+        f"<style>{_notebook_stylesheets[style]}</style>"
+        + html_body(info, include, css_class=f"friendly {style}")
+    )
     return ""
 
 
 if not ipython_available:
     jupyter = repl  # noqa
+    notebook = repl  # noqa
+
+
+def html_stylesheet(style: str = None, scope: str = ".friendly") -> str:  # pragma: no cover
+    """Returns the css required by the html() formatter, applying
+    to the elements found in those selected by scope."""
+    from pygments.token import Text
+    from friendly.theme.lookup import get_pygments_css, get_pygments_style
+
+    style = style or HTML_STYLE
+    pygments_style = get_pygments_style(style)
+    color = pygments_style.style_for_token(Text)["color"]
+    css = get_pygments_css(style, f"{scope} .highlight")
+    return "\n".join(
+        [
+            "{scope} {{ background-color: {background}; color: {color}; }}".format(
+                scope=scope,
+                background=pygments_style.background_color,
+                color="#" + color if color else "inherit",
+            ),
+            f"{scope} p {{ max-width: 70ch; }}",
+            f"{scope} h3 {{ font-size: 1em; }}",
+            css,
+        ]
+    )
+
+
+def write_html_stylesheet(path: str, style: str = None) -> None:  # pragma: no cover
+    """Writes the css required by the html() formatter in a file
+    and use it instead of embedding the css in each html document.
+    The path written is used as is to link the stylesheet; it should
+    thus be relative to the location of the html documents.
+    """
+    global HTML_STYLESHEET
+    with open(path, "w", encoding="utf8") as f:
+        f.write(html_stylesheet(style))
+    HTML_STYLESHEET = path
+
+
+@metrics.counted_formatter("html")
+def html(info: Info, include: InclusionChoice = "friendly_tb") -> str:  # pragma: no cover
+    """Traceback formatted as a complete html document, using pygments
+    for highlighting the code.
+
+    By default, the css is embedded in the document so that it is
+    self-contained. When many documents are written, a single stylesheet
+    can be shared by all of them by using write_html_stylesheet().
+    """
+    if HTML_STYLESHEET is None:
+        style = "<style>\n{css}\n</style>".format(css=html_stylesheet())
+    else:
+        style = '<link rel="stylesheet" href="{href}">'.format(
+            href=html_escape(HTML_STYLESHEET)
+        )
+    return "\n".join(
+        [
+            "<!DOCTYPE html>",
+            '<html lang="{lang}">'.format(lang=info_lang(info)),
+            "<head>",
+            '<meta charset="utf-8">',
+            "<title>{title}</title>".format(title=html_escape(info.get("message", "").strip())),
+            style,
+            "</head>",
+            "<body>",
+            html_body(info, include),
+            "</body>",
+            "</html>",
+            "",
+        ]
+    )
+
+
+def html_body(
+    info: Info, include: InclusionChoice = "friendly_tb", css_class: str = "friendly"
+) -> str:  # pragma: no cover
+    """Traceback formatted as a html fragment, with css classes
+    used for styling the various items."""
+    from pygments import highlight  # noqa
+    from pygments.lexers import PythonLexer, PythonTracebackLexer  # noqa
+    from pygments.formatters import HtmlFormatter  # noqa
+    from friendly import theme  # noqa  Monkeypatches PythonTracebackLexer
+
+    items_to_show = select_items(include)
+    info = truncate_info(info, items_to_show)
+    result = [f'<div class="{css_class}">']
+    for item in items_to_show:
+        if item not in info or not info[item].strip():
+            continue
+        if "source" in item or "variable" in item:
+            result.append(highlight(info[item], PythonLexer(), HtmlFormatter()))
+        elif "traceback" in item:
+            result.append(
+                highlight(info[item], PythonTracebackLexer(), HtmlFormatter())
+            )
+        elif item == "message":  # format like last line of traceback
+            content = html_escape(info[item]).split(":")
+            error_name = content[0]
+            message = ":".join(content[1:]) if len(content) > 1 else ""
+            result.append(
+                "".join(
+                    [
+                        '<div class="highlight"><pre><span class="gr">',
+                        error_name,
+                        '</span>: <span class="n">',
+                        message,
+                        "</span></pre></div>",
+                    ]
+                )
+            )
+        elif "header" in item:
+            text = html_escape(info[item].rstrip().rstrip(":"))
+            result.append(f'<h3 class="{item}">{text}</h3>')
+        elif item == "suggest":
+            text = html_escape(info[item])
+            result.append(f'<p class="{item}"><i>{text}</i></p>')
+        else:
+            text = html_escape(info[item])
+            result.append(f'<p class="{item}">{text}</p>')
+    if len(result) == 1:
+        text = no_result(info, include)
+        if text:
+            result.append("<p>{text}</p>".format(text=html_escape(text)))
+    result.append("</div>")
+    return "\n".join(result)
+
+
+@metrics.counted_formatter("json")
+def json(info: Info, include: InclusionChoice = "friendly_tb") -> str:
+    """Traceback information formatted as a JSON object, intended to be
+    processed by other programs rather than read by humans.
+
+    The object has three keys: ``"lang"``, ``"include"`` and ``"items"``.
+    The keys of ``"items"`` are the names of all the items selected by
+    ``include``, in the order in which other formatters show them;
+    items for which no information is available have a ``null`` value.
+    """
+    items = {item: info.get(item) for item in select_items(include)}
+    return dumps(
+        {"lang": info_lang(info), "include": include, "items": items},
+        ensure_ascii=False,
+    )
 
 
+@metrics.counted_formatter("markdown")
 def markdown(
     info: Info, include: InclusionChoice = "friendly_tb"
 ) -> str:  # pragma: no cover
@@ -290,6 +644,7 @@ def markdown(
     return _markdown(info, include)
 
 
+@metrics.counted_formatter("markdown_docs")
 def markdown_docs(
     info: Info, include: InclusionChoice = "explain"
 ) -> str:  # pragma: no cover
@@ -305,6 +660,7 @@ def markdown_docs(
     return _markdown(info, include, documentation=True)
 
 
+@metrics.counted_formatter("rich_markdown", rendered=True)
 def rich_markdown(
     info: Info, include: InclusionChoice = "friendly_tb"
 ) -> str:  # pragma: no cover
@@ -321,6 +677,7 @@ def rich_markdown(
     return _markdown(info, include, rich=True)
 
 
+@metrics.timed("_markdown")
 def _markdown(
     info: Info,
     include: InclusionChoice,
@@ -328,16 +685,17 @@ def _markdown(
     documentation: bool = False,
 ) -> str:  # pragma: no cover
     """Traceback formatted with with markdown syntax."""
-    global RICH_HEADER, WIDE_OUTPUT
-    if (
-        rich
-        and session.is_jupyter
-        and session.rich_tb_width is not None
-        and session.rich_tb_width != session.rich_width
-        and include in ["friendly_tb", "python_tb", "debug_tb", "where", "explain"]
-    ):
-        session.console.width = session.rich_tb_width
-        WIDE_OUTPUT = True
+    if rich:
+        width = None
+        if (
+            session.is_jupyter
+            and session.rich_tb_width is not None
+            and session.rich_tb_width != session.rich_width
+            and include in ["friendly_tb", "python_tb", "debug_tb", "where", "explain"]
+        ):
+            width = session.rich_tb_width
+        # The header is added by rich_writer()
+        _render_state.set({"header": include == "explain", "width": width})
     markdown_items = {
         "header": ("# ", ""),
         "message": ("", ""),
@@ -358,8 +716,8 @@ def _markdown(
     }
 
     items_to_show = select_items(include)  # tb_items_to_show(level=level)
-    if rich and include == "explain":
-        RICH_HEADER = True  # Skip it here; handled by session.py
+    # Truncation must be done prior to highlighting and word-wrapping.
+    info = truncate_info(info, items_to_show)
     result = [""]
     for item in items_to_show:
         if item in info and info[item].strip():
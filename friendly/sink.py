@@ -0,0 +1,100 @@
+"""
+sink.py
+=======
+
+When the output is sent to a pipe or a file, for example to be collected
+by a logging system, it is preferable for each explanation to be written
+with a single call instead of as many small writes: Rich writes each
+print() separately, and a stream may write each line separately.
+"""
+import atexit
+import sys
+import weakref
+
+from .my_gettext import current_lang
+
+_sinks = weakref.WeakSet()
+
+
+@atexit.register
+def emit_all():
+    """Writes the content not yet written by any sink."""
+    for sink in list(_sinks):
+        sink.emit()
+
+
+class BufferedSink:
+    """Assembles the output of each explanation in memory and writes it
+    with a single call to ``write``, by default ``sys.stderr.write``.
+
+    An instance can be used as a writer, that is a callable taking a string,
+    in which case the string is written at once, or as the file of a Rich
+    console. In the latter case, the content written after ``hold()``
+    is called, such as an explanation, is only written when ``emit()``
+    is called; other content, such as values shown by the console,
+    is written immediately.
+
+    If ``max_size`` is specified, the content of a single explanation is
+    limited to that number of characters; what exceeds it is omitted and
+    not kept in memory. Content not yet written is written on exit.
+    """
+
+    def __init__(self, write=None, max_size=None):
+        self._write = write
+        self.max_size = max_size
+        self._parts = []
+        self._size = 0
+        self._omitted = 0
+        self._holding = False
+        _sinks.add(self)
+
+    def __call__(self, text):
+        self.hold()
+        self.write(text)
+        self.emit()
+
+    def hold(self):
+        """Keeps what is written until emit() is called."""
+        self._holding = True
+
+    def write(self, text):
+        if not self._holding:
+            write = self._write or sys.stderr.write
+            write(text)
+            return len(text)
+        if self.max_size is not None and self._size + len(text) > self.max_size:
+            kept = max(0, self.max_size - self._size)
+            self._omitted += len(text) - kept
+            text = text[:kept]
+        if text:
+            self._parts.append(text)
+            self._size += len(text)
+        return len(text)
+
+    def flush(self):
+        """Called by Rich after each print(); the content is kept
+        until emit() is called."""
+
+    def emit(self):
+        """Writes the content assembled so far with a single call."""
+        _ = current_lang.translate
+        self._holding = False
+        if not self._parts and not self._omitted:
+            return
+        text = "".join(self._parts)
+        if self._omitted:
+            text += (
+                "\n"
+                + _("... [{number} characters omitted] ...").format(
+                    number=self._omitted
+                )
+                + "\n"
+            )
+        self._parts = []
+        self._size = 0
+        self._omitted = 0
+        write = self._write or sys.stderr.write
+        write(text)
+
+    def isatty(self):
+        return False
@@ -1,14 +1,16 @@
 """Syntax colouring based on the availability of pygments
 """
-from pygments import styles
-
 from . import friendly_rich
 from . import patch_tb_lexer  # noqa will automatically Monkeypatch
+from .lookup import get_pygments_style
 from ..my_gettext import current_lang
 
-friendly_light = styles.get_style_by_name("friendly_light")
-friendly_dark = styles.get_style_by_name("friendly_dark")
+friendly_light = get_pygments_style("friendly_light")
+friendly_dark = get_pygments_style("friendly_dark")
 CURRENT_THEME = "friendly_light"
+# Rich looks up pygments styles given by name each time that some code
+# is shown; we use an instance instead.
+CURRENT_SYNTAX_THEME = friendly_rich.PygmentsSyntaxTheme(friendly_light)
 
 
 def validate_color(color):
@@ -31,20 +33,27 @@ def validate_color(color):
 
 
 def init_rich_console(
-    style="dark", color_system="auto", force_jupyter=None, background=None
+    style="dark", color_system="auto", force_jupyter=None, background=None, file=None
 ):
-    global CURRENT_THEME
+    global CURRENT_THEME, CURRENT_SYNTAX_THEME
     background = validate_color(background)
     if style == "light":
         theme = "friendly_light"
         if background is not None:
             friendly_light.background_color = background
+        syntax_theme = friendly_rich.PygmentsSyntaxTheme(friendly_light)
     else:
         theme = "friendly_dark"
         if background is not None:
             friendly_dark.background_color = background
+        syntax_theme = friendly_rich.PygmentsSyntaxTheme(friendly_dark)
     CURRENT_THEME = theme
+    CURRENT_SYNTAX_THEME = syntax_theme
 
     return friendly_rich.init_console(
-        style=style, theme=theme, color_system=color_system, force_jupyter=force_jupyter
+        style=style,
+        theme=syntax_theme,
+        color_system=color_system,
+        force_jupyter=force_jupyter,
+        file=file,
     )
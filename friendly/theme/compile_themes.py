@@ -0,0 +1,88 @@
+"""Precomputes the styles used by friendly and saves them in a module,
+``compiled_themes.py``, so that they can be imported without relying on
+the discovery of pygments plugins at runtime.
+
+Usage::
+
+    python -m friendly.theme.compile_themes [output_path]
+
+By default, the module is written in the same directory as this file.
+This is done automatically when building friendly with setuptools.
+"""
+import os
+import sys
+from pprint import pformat
+
+from pygments import styles
+
+THEMES = ["friendly_light", "friendly_dark"]
+# Style and selector for each css to precompute;
+# "default" is the style used by the jupyter() formatter.
+CSS = [
+    ("friendly_light", ".friendly .highlight"),
+    ("friendly_dark", ".friendly .highlight"),
+    ("default", ".highlight"),
+]
+
+HEADER = '''"""Precomputed styles for friendly.
+
+This file was generated by friendly.theme.compile_themes; do not edit.
+"""
+from pygments.style import Style
+from pygments.token import Token
+
+
+'''
+
+
+def _class_source(name):
+    """Returns the source code of a class equivalent to a pygments style."""
+    style = styles.get_style_by_name(name)
+    lines = [
+        f"class {style.__name__}(Style):",
+        f"    background_color = {style.background_color!r}",
+        f"    highlight_color = {style.highlight_color!r}",
+        f"    default_style = {style.default_style!r}",
+        "    friendly_style = {!r}".format(getattr(style, "friendly_style", {})),
+        "    styles = {",
+    ]
+    for token, definition in style.styles.items():
+        lines.append(f"        {token}: {definition!r},")
+    lines.append("    }")
+    return "\n".join(lines)
+
+
+def compile_themes():
+    """Returns the source code of the module with precomputed styles."""
+    from .lookup import make_pygments_css, make_rich_styles
+
+    parts = [HEADER]
+    for name in THEMES:
+        parts.append(_class_source(name))
+        parts.append("\n\n")
+    parts.append("PYGMENTS_STYLES = {\n")
+    for name in THEMES:
+        parts.append(f"    {name!r}: {styles.get_style_by_name(name).__name__},\n")
+    parts.append("}\n\n")
+    rich_styles = {
+        name: make_rich_styles(styles.get_style_by_name(name)) for name in THEMES
+    }
+    parts.append(f"RICH_STYLES = {pformat(rich_styles)}\n\n")
+    css = {
+        (name, selector): make_pygments_css(styles.get_style_by_name(name), selector)
+        for name, selector in CSS
+    }
+    parts.append(f"CSS = {pformat(css)}\n")
+    return "".join(parts)
+
+
+def main(path=None):
+    if path is None:
+        path = os.path.join(os.path.dirname(__file__), "compiled_themes.py")
+    source = compile_themes()
+    with open(path, "w", encoding="utf8") as f:
+        f.write(source)
+
+
+if __name__ == "__main__":
+    main(*sys.argv[1:2])
@@ -8,55 +8,88 @@ from rich import pretty  # noqa
 from rich.console import Console  # noqa
 from rich.markdown import Markdown, Heading, CodeBlock  # noqa
 from rich.panel import Panel  # noqa
-from rich.syntax import Syntax  # noqa
+from rich.style import Style  # noqa
+from rich.syntax import PygmentsSyntaxTheme, Syntax  # noqa
 from rich.text import Text  # noqa
 from rich.theme import Theme  # noqa
 
-from pygments import styles
+from .lookup import get_pygments_style, get_rich_styles
 
-friendly_light = styles.get_style_by_name("friendly_light")
-friendly_dark = styles.get_style_by_name("friendly_dark")
+friendly_light = get_pygments_style("friendly_light")
+friendly_dark = get_pygments_style("friendly_dark")
 
-dark_background_theme = Theme(friendly_dark.friendly_style)
-light_background_theme = Theme(friendly_light.friendly_style)
+
+def _make_theme(name):
+    """Creates a Rich theme from the styles defined in a pygments style."""
+    return Theme(
+        {
+            style_name: Style(**kwargs)
+            for style_name, kwargs in get_rich_styles(name).items()
+        }
+    )
+
+
+dark_background_theme = _make_theme("friendly_dark")
+light_background_theme = _make_theme("friendly_light")
+
+
+# Theme used for code blocks when none is specified with Markdown();
+# set by init_console().
+CODE_THEME = None  # not a constant
+
+
+def _patch_heading(self, *_args):
+    """By default, all headings are centered by Rich; I prefer to have
+    them left-justified, except for <h3>
+    """
+    text = self.text
+    text.justify = "left"
+    if self.level == 3:
+        yield Text("    ") + text
+    else:
+        yield text
+
+
+def _patch_code_block(self, *_args):
+    code = str(self.text).rstrip()
+    if self.lexer_name == "default":
+        self.lexer_name = "python"
+    # friendly gives a theme instance to Markdown(); otherwise, the name
+    # of Rich's default theme is used and we replace it by our own.
+    theme = self.theme
+    if isinstance(theme, str) and CODE_THEME is not None:
+        theme = CODE_THEME
+    syntax = Syntax(code, self.lexer_name, theme=theme, word_wrap=True)
+    yield syntax
+
+
+Heading.__rich_console__ = _patch_heading
+CodeBlock.__rich_console__ = _patch_code_block
 
 
 def init_console(
-    style="dark", theme="brunante", color_system="auto", force_jupyter=None
+    style="dark", theme="brunante", color_system="auto", force_jupyter=None, file=None
 ):
-    def _patch_heading(self, *_args):
-        """By default, all headings are centered by Rich; I prefer to have
-        them left-justified, except for <h3>
-        """
-        text = self.text
-        text.justify = "left"
-        if self.level == 3:
-            yield Text("    ") + text
-        else:
-            yield text
-
-    Heading.__rich_console__ = _patch_heading
-
-    def _patch_code_block(self, *_args):
-        code = str(self.text).rstrip()
-        if self.lexer_name == "default":
-            self.lexer_name = "python"
-        syntax = Syntax(code, self.lexer_name, theme=theme, word_wrap=True)
-        yield syntax
-
-    CodeBlock.__rich_console__ = _patch_code_block
+    global CODE_THEME
+    # Using an instance, rather than the name of a pygments style,
+    # avoids having Rich look for the style each time code is shown.
+    if isinstance(theme, str):
+        theme = PygmentsSyntaxTheme(get_pygments_style(theme))
+    CODE_THEME = theme
 
     if style == "light":
         console = Console(
             theme=light_background_theme,
             color_system=color_system,  # noqa
             force_jupyter=force_jupyter,
+            file=file,
         )
     else:
         console = Console(
             theme=dark_background_theme,
             color_system=color_system,  # noqa
             force_jupyter=force_jupyter,
+            file=file,
         )
 
     pretty.install(console=console, indent_guides=True)
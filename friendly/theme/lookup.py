@@ -0,0 +1,88 @@
+"""Retrieval of the styles used by friendly.
+
+Finding a pygments style by name requires pygments to look for plugins
+using entry points, which can be very slow, for example on network
+filesystems. To avoid this, the styles and the data derived from them
+can be precomputed and saved in a module named ``compiled_themes``,
+using ``python -m friendly.theme.compile_themes``.
+When this module is not available, everything is computed as needed.
+"""
+from pygments import styles
+
+from .. import metrics
+
+try:
+    from . import compiled_themes
+except ImportError:
+    compiled_themes = None
+
+_cache = {}
+
+
+def get_pygments_style(name):
+    """Returns the pygments style class, given its name."""
+    if compiled_themes is not None and name in compiled_themes.PYGMENTS_STYLES:
+        return compiled_themes.PYGMENTS_STYLES[name]
+    if name not in _cache:
+        metrics.increment("cache_misses.theme")
+        _cache[name] = styles.get_style_by_name(name)
+    else:
+        metrics.increment("cache_hits.theme")
+    return _cache[name]
+
+
+def get_rich_styles(name):
+    """Returns a dict whose values are the keyword arguments needed to create
+    the Rich styles used in a theme, given the name of the pygments style
+    that defines them."""
+    if compiled_themes is not None and name in compiled_themes.RICH_STYLES:
+        return compiled_themes.RICH_STYLES[name]
+    if ("rich", name) not in _cache:
+        metrics.increment("cache_misses.theme")
+        _cache[("rich", name)] = make_rich_styles(get_pygments_style(name))
+    else:
+        metrics.increment("cache_hits.theme")
+    return _cache[("rich", name)]
+
+
+def get_pygments_css(name, selector):
+    """Returns the css for a pygments style, given its name and
+    the css selector to which it applies."""
+    if compiled_themes is not None and (name, selector) in compiled_themes.CSS:
+        return compiled_themes.CSS[(name, selector)]
+    if (name, selector) not in _cache:
+        metrics.increment("cache_misses.theme")
+        _cache[(name, selector)] = make_pygments_css(
+            get_pygments_style(name), selector
+        )
+    else:
+        metrics.increment("cache_hits.theme")
+    return _cache[(name, selector)]
+
+
+def make_rich_styles(pygments_style):
+    """Parses the Rich styles defined in a pygments style class."""
+    from rich.style import Style
+
+    rich_styles = {}
+    for style_name, definition in pygments_style.friendly_style.items():
+        style = Style.parse(definition)
+        kwargs = {}
+        if style.color is not None:
+            kwargs["color"] = style.color.name
+        if style.bgcolor is not None:
+            kwargs["bgcolor"] = style.bgcolor.name
+        for attribute in Style.STYLE_ATTRIBUTES.values():
+            if getattr(style, attribute) is not None:
+                kwargs[attribute] = getattr(style, attribute)
+        if style.link:
+            kwargs["link"] = style.link
+        rich_styles[style_name] = kwargs
+    return rich_styles
+
+
+def make_pygments_css(pygments_style, selector):
+    """Generates the css for a pygments style class."""
+    from pygments.formatters import HtmlFormatter  # noqa
+
+    return HtmlFormatter(style=pygments_style).get_style_defs(selector)
@@ -0,0 +1,185 @@
+"""
+truncate.py
+===========
+
+Some of the information provided by friendly-traceback can be very large:
+the repr of a dict with a million entries, a minified line of code
+containing hundreds of thousands of characters, etc.
+Rather than having such content being word-wrapped and highlighted in its
+entirety, we truncate it before handing it to a formatter,
+indicating how much content was left out.
+Similarly, the long sequences of identical frames found in tracebacks
+of RecursionError are collapsed into a single line.
+
+A value of ``None`` for any of the limits means that no limit is applied.
+"""
+import re
+
+from .my_gettext import current_lang
+
+MAX_CHARACTERS = 10_000  # not a constant; for each info item
+MAX_LINES = 200  # not a constant; for each block of text or code
+MAX_COLUMNS = 500  # not a constant; for each line
+# Longest sequence of frames, repeated in a traceback, that is collapsed.
+MAX_PERIOD = 10
+
+FRAME_START = re.compile(r'[ \t]*File ".*", line \d+')
+FRAME_SPLIT = re.compile(r'\n(?=[ \t]*File ".*", line \d+)')
+
+
+def set_limits(characters=None, lines=None, columns=None):
+    """Changes the limits used to truncate the information shown.
+    Only the values specified are changed; a value of 0 removes
+    the corresponding limit.
+    """
+    global MAX_CHARACTERS, MAX_LINES, MAX_COLUMNS
+    if characters is not None:
+        MAX_CHARACTERS = characters or None
+    if lines is not None:
+        MAX_LINES = lines or None
+    if columns is not None:
+        MAX_COLUMNS = columns or None
+
+
+def get_limits():
+    """Returns the current limits as a dict."""
+    return {"characters": MAX_CHARACTERS, "lines": MAX_LINES, "columns": MAX_COLUMNS}
+
+
+def truncate(text):
+    """Truncates some text so that it does not exceed the current limits.
+
+    The number of characters is reduced first, so that the processing
+    of lines is done on a string of bounded size. When some content is
+    removed, we keep both the beginning and the end of the text,
+    as the end of a traceback is usually the most relevant part.
+    """
+    _ = current_lang.translate
+    if MAX_CHARACTERS is not None and len(text) > MAX_CHARACTERS:
+        half = MAX_CHARACTERS // 2
+        omitted = len(text) - 2 * half
+        text = (
+            text[:half]
+            + "\n"
+            + _("... [{number} characters omitted] ...").format(number=omitted)
+            + "\n"
+            + text[len(text) - half :]
+        )
+
+    if MAX_COLUMNS is None and MAX_LINES is None:
+        return text
+
+    lines = text.split("\n")
+    if MAX_COLUMNS is not None:
+        for index, line in enumerate(lines):
+            if len(line) > MAX_COLUMNS:
+                lines[index] = line[:MAX_COLUMNS] + " " + _(
+                    "... [{number} characters omitted]"
+                ).format(number=len(line) - MAX_COLUMNS)
+
+    if MAX_LINES is not None and len(lines) > MAX_LINES:
+        head = MAX_LINES // 2
+        tail = MAX_LINES - head
+        omitted = len(lines) - head - tail
+        lines = (
+            lines[:head]
+            + [_("... [{number} lines omitted] ...").format(number=omitted)]
+            + lines[len(lines) - tail :]
+        )
+
+    return "\n".join(lines)
+
+
+def _split_frames(text):
+    """Splits a traceback into blocks: a frame is a line starting with
+    'File' together with the more indented lines that follow; any other
+    line is a block by itself. Returns a list of (is_frame, text) tuples."""
+    blocks = []
+    for chunk in FRAME_SPLIT.split(text):
+        lines = chunk.split("\n")
+        if not FRAME_START.match(lines[0]):  # before the first frame
+            blocks.extend((False, line) for line in lines)
+            continue
+        indentation = len(lines[0]) - len(lines[0].lstrip())
+        end = 1
+        while (
+            end < len(lines)
+            and lines[end].strip()
+            and len(lines[end]) - len(lines[end].lstrip()) > indentation
+        ):
+            end += 1
+        if end == len(lines):
+            blocks.append((True, chunk))
+        else:
+            blocks.append((True, "\n".join(lines[:end])))
+            blocks.extend((False, line) for line in lines[end:])
+    return blocks
+
+
+def _find_repeat(blocks, start):
+    """Finds the sequence of frames, beginning at index start, which
+    is repeated consecutively so as to cover the most frames.
+    Returns its length and the number of times it is repeated after
+    its first occurrence."""
+    best_period = best_repeats = 0
+    for period in range(1, MAX_PERIOD + 1):
+        pattern = blocks[start : start + period]
+        if len(pattern) < period or not all(is_frame for is_frame, _ in pattern):
+            break
+        repeats = 0
+        index = start + period
+        while blocks[index : index + period] == pattern:
+            repeats += 1
+            index += period
+        if repeats * period > best_repeats * best_period:
+            best_period, best_repeats = period, repeats
+    return best_period, best_repeats
+
+
+def collapse_repeated_frames(text):
+    """Replaces sequences of frames repeated consecutively in a traceback,
+    as is the case for a RecursionError, by a single occurrence followed by
+    a line indicating how many times it was repeated.
+    """
+    _ = current_lang.translate
+    if text.count("File ") < 3:
+        return text
+    blocks = _split_frames(text)
+    lines = []
+    index = 0
+    while index < len(blocks):
+        is_frame, block = blocks[index]
+        if not is_frame:
+            lines.append(block)
+            index += 1
+            continue
+        period, repeats = _find_repeat(blocks, index)
+        if repeats < 2:
+            lines.append(block)
+            index += 1
+            continue
+        for _is_frame, frame in blocks[index : index + period]:
+            lines.append(frame)
+        indentation = block[: len(block) - len(block.lstrip())]
+        if period == 1:
+            message = _("[Previous frame repeated {repeats} more times]")
+        else:
+            message = _("[Previous {number} frames repeated {repeats} more times]")
+        lines.append(indentation + message.format(number=period, repeats=repeats))
+        index += period * (repeats + 1)
+    return "\n".join(lines)
+
+
+def truncate_info(info, items):
+    """Returns a shallow copy of info where the content of the items
+    listed has been truncated, after collapsing repeated frames in
+    tracebacks. Other entries are unchanged.
+    """
+    new_info = dict(info)
+    for item in items:
+        if item in info and isinstance(info[item], str):
+            text = info[item]
+            if "traceback" in item:
+                text = collapse_repeated_frames(text)
+            new_info[item] = truncate(text)
+    return new_info
@@ -1,3 +1,38 @@
+import os
+import sys
+
 from setuptools import setup
+from setuptools.command.build_py import build_py
+
+HERE = os.path.dirname(os.path.abspath(__file__))
+
+
+class BuildPyWithThemes(build_py):
+    """Adds the module with precomputed styles to the build.
+    friendly works without it, but imports more slowly.
+
+    The dependencies needed to compute the styles are listed as build
+    requirements in pyproject.toml; if they are missing, the build fails
+    rather than silently producing a package without this module."""
+
+    def run(self):
+        super().run()
+        if self.dry_run:
+            return
+        # The package is imported from the source tree, which is not
+        # necessarily on the path in an isolated build.
+        sys.path.insert(0, HERE)
+        try:
+            from friendly.theme import compile_themes
+        except ImportError as e:
+            raise RuntimeError(
+                "The styles of friendly cannot be precomputed: {}. "
+                "The build requirements are listed in pyproject.toml.".format(e)
+            ) from e
+        finally:
+            sys.path.remove(HERE)
+        path = os.path.join(self.build_lib, "friendly", "theme", "compiled_themes.py")
+        compile_themes.main(path)
+
 
-setup()
+setup(cmdclass={"build_py": BuildPyWithThemes})
@@ -0,0 +1,216 @@
+"""Benchmarks the formatters by replaying the information recorded
+in corpus.json (see record_corpus.py).
+
+For each formatter, the number of exceptions formatted per second and
+the 95th percentile of the time taken for a single exception are reported.
+Stand-ins are used for IPython's display() and for IDLE's shell, so that
+neither a Jupyter kernel nor IDLE is needed.
+
+Usage::
+
+    python tools/benchmark_formatters.py [--repeat N] [--include INCLUDE,...]
+        [--save-baseline PATH] [--baseline PATH] [--tolerance FRACTION]
+
+If a baseline is given, the exit code is 1 if any formatter is slower than
+its baseline by more than the tolerance (default: 0.25, i.e. 25%).
+"""
+import argparse
+import importlib.machinery
+import io
+import json
+import os
+import sys
+import time
+import types
+
+HERE = os.path.dirname(os.path.abspath(__file__))
+sys.path.insert(0, os.path.dirname(HERE))
+
+
+class FakeDisplay:
+    """Stand-in for IPython.display, keeping what would be displayed."""
+
+    def __init__(self):
+        self.output = []
+
+    def display(self, obj):
+        self.output.append(obj)
+
+    @staticmethod
+    def HTML(content):  # noqa
+        return content
+
+
+class FakeShell:
+    """Stand-in for IDLE's shell, which writes text with a colour tag."""
+
+    def __init__(self):
+        self.output = []
+
+    def write(self, text, tag):
+        self.output.append((text, tag))
+
+
+def install_stand_ins():
+    """Installs stand-ins for IPython.display and for IDLE.
+    This must be done prior to importing friendly."""
+    fake_display = FakeDisplay()
+    ipython = types.ModuleType("IPython")
+    ipython.__spec__ = importlib.machinery.ModuleSpec("IPython", None)
+    ipython.__path__ = []
+    display = types.ModuleType("IPython.display")
+    display.__spec__ = importlib.machinery.ModuleSpec("IPython.display", None)
+    display.display = fake_display.display
+    display.HTML = fake_display.HTML
+    ipython.display = display
+    sys.modules["IPython"] = ipython
+    sys.modules["IPython.display"] = display
+
+    # friendly.idle imports idlelib, which requires tkinter; we only need
+    # the idle_formatter module, so we avoid executing friendly/idle/__init__.py
+    import friendly
+
+    idle = types.ModuleType("friendly.idle")
+    idle.__path__ = [os.path.join(os.path.dirname(friendly.__file__), "idle")]
+    sys.modules["friendly.idle"] = idle
+    return fake_display, FakeShell()
+
+
+def idle_write(shell, output):
+    """Same as friendly.idle.main.idle_writer, but using a given shell."""
+    if isinstance(output, str):
+        shell.write(output, "stderr")
+        return
+    for fragment in output:
+        if isinstance(fragment, str):
+            shell.write(fragment, "stderr")
+        else:
+            shell.write(fragment[0], fragment[1])
+
+
+def get_formatters(fake_display, shell):
+    """Returns a dict of functions formatting and writing a single
+    exception, using each of the formatters."""
+    import friendly
+    from friendly import rich_formatters
+    from friendly.idle import idle_formatter
+    from friendly_traceback.config import session
+
+    friendly.set_formatter("dark", color_system="truecolor")
+    terminal_console = session.console
+    terminal_console.file = io.StringIO()
+    friendly.set_formatter("interactive", force_jupyter=True)
+    jupyter_console = session.console
+
+    def rich_markdown(info, include):
+        session.console = terminal_console
+        session.rich_add_vspace = True
+        rich_formatters.rich_writer(rich_formatters.rich_markdown(info, include))
+        terminal_console.file = io.StringIO()
+
+    def jupyter_interactive(info, include):
+        session.console = jupyter_console
+        rich_formatters.jupyter_interactive(info, include)
+        fake_display.output.clear()
+
+    def jupyter(info, include):
+        rich_formatters.jupyter(info, include)
+        fake_display.output.clear()
+
+    def notebook(info, include):
+        rich_formatters.notebook(info, include)
+        fake_display.output.clear()
+
+    def idle(info, include):
+        idle_write(shell, idle_formatter.idle_formatter(info, include))
+        shell.output.clear()
+
+    return {
+        "rich_markdown": rich_markdown,
+        "markdown": rich_formatters.markdown,
+        "markdown_docs": rich_formatters.markdown_docs,
+        "jupyter": jupyter,
+        "jupyter_interactive": jupyter_interactive,
+        "notebook": notebook,
+        "idle_formatter": idle,
+    }
+
+
+def benchmark(function, corpus, includes, repeat):
+    """Returns the number of exceptions formatted per second and the
+    95th percentile of the time needed to format a single exception."""
+    durations = []
+    for _ in range(repeat):
+        for entry in corpus:
+            for include in includes:
+                start = time.perf_counter()
+                function(entry["info"], include)
+                durations.append(time.perf_counter() - start)
+    durations.sort()
+    p95 = durations[min(len(durations) - 1, int(0.95 * len(durations)))]
+    return {"per_second": len(durations) / sum(durations), "p95": p95}
+
+
+def find_regressions(results, baseline, tolerance):
+    """Returns a list of descriptions of the regressions found."""
+    regressions = []
+    for name, result in results.items():
+        if name not in baseline:
+            continue
+        expected = baseline[name]
+        if result["per_second"] < expected["per_second"] * (1 - tolerance):
+            regressions.append(
+                f"{name}: {result['per_second']:.1f} exceptions/s "
+                f"(baseline: {expected['per_second']:.1f})"
+            )
+        if result["p95"] > expected["p95"] * (1 + tolerance):
+            regressions.append(
+                f"{name}: p95 = {result['p95'] * 1000:.2f} ms "
+                f"(baseline: {expected['p95'] * 1000:.2f} ms)"
+            )
+    return regressions
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.split("\n")[0])
+    parser.add_argument("--corpus", default=os.path.join(HERE, "corpus.json"))
+    parser.add_argument("--repeat", type=int, default=5)
+    parser.add_argument("--include", default="explain,python_tb,debug_tb")
+    parser.add_argument("--baseline")
+    parser.add_argument("--save-baseline")
+    parser.add_argument("--tolerance", type=float, default=0.25)
+    args = parser.parse_args()
+
+    with open(args.corpus, encoding="utf8") as f:
+        corpus = json.load(f)
+
+    includes = args.include.split(",")
+    fake_display, shell = install_stand_ins()
+    formatters = get_formatters(fake_display, shell)
+    results = {}
+    print(f"{'formatter':25}{'exceptions/s':>15}{'p95 (ms)':>12}")
+    for name, function in formatters.items():
+        function(corpus[0]["info"], includes[0])  # warm up
+        results[name] = benchmark(function, corpus, includes, args.repeat)
+        print(
+            f"{name:25}{results[name]['per_second']:15.1f}"
+            f"{results[name]['p95'] * 1000:12.2f}"
+        )
+
+    if args.save_baseline:
+        with open(args.save_baseline, "w", encoding="utf8") as f:
+            json.dump(results, f, indent=4)
+
+    if args.baseline:
+        with open(args.baseline, encoding="utf8") as f:
+            baseline = json.load(f)
+        regressions = find_regressions(results, baseline, args.tolerance)
+        if regressions:
+            print("\nRegressions found:")
+            for regression in regressions:
+                print("    " + regression)
+            sys.exit(1)
+
+
+if __name__ == "__main__":
+    main()
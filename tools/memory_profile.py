@@ -0,0 +1,285 @@
+"""Measures the memory used by friendly, using tracemalloc.
+
+Three suites are available:
+
+* ``formatters``: peak memory allocated while rendering each exception
+  recorded in corpus.json (see record_corpus.py), for each formatter.
+* ``console``: steady-state memory growth of a FriendlyConsole session
+  after a large number of inputs, many of which raise exceptions.
+* ``ipython``: same as ``console``, but for an IPython session using
+  friendly.ipython.
+
+Usage::
+
+    python tools/memory_profile.py [formatters|console|ipython ...]
+        [--inputs N] [--formatter NAME] [--top N] [--frames N]
+
+By default, all the suites are run, each in a separate process.
+For the sessions, the growth is attributed to friendly, friendly_traceback,
+rich, pygments, IPython or other code, using the most recent frame from
+one of these packages in the traceback of each allocation (see --frames),
+and the size of the data structures known to grow with the number of
+inputs is reported.
+"""
+import argparse
+import contextlib
+import gc
+import io
+import json
+import linecache
+import os
+import subprocess
+import sys
+import tracemalloc
+
+HERE = os.path.dirname(os.path.abspath(__file__))
+sys.path.insert(0, HERE)
+sys.path.insert(0, os.path.dirname(HERE))
+
+SUITES = ["formatters", "console", "ipython"]
+
+# Inputs repeated in the sessions; a mix of valid code, runtime errors,
+# syntax errors and set_formatter() calls, as seen in tutoring sessions.
+SESSION_INPUTS = [
+    "a = 1",
+    "b = a + 1",
+    "c = undefined_name",
+    "1 / 0",
+    "[1, 2, 3][b + 5]",
+    "if a = 1: pass",
+    "def f(n):\n    return n + 'a'\n",
+    "f(b)",
+    "data = list(range(100))",
+    "set_formatter('dark')",
+]
+
+PACKAGES = ["friendly_traceback", "friendly", "rich", "pygments", "IPython"]
+
+
+class Sink(io.TextIOBase):
+    """Output stream discarding everything written to it, so that the
+    output itself does not use memory."""
+
+    def write(self, text):
+        return len(text)
+
+    def isatty(self):
+        return False
+
+
+def category(traceback):
+    """Returns the package responsible for an allocation: the one in which
+    the most recent frame of the traceback belonging to a known package is."""
+    for frame in reversed(traceback):
+        parts = frame.filename.replace("\\", "/").split("/")
+        for package in PACKAGES:
+            if package in parts:
+                return package
+    return "other"
+
+
+def kib(size):
+    return f"{size / 1024:10.1f} KiB"
+
+
+def profile_formatters(args):
+    """Reports the peak memory allocated while rendering each exception
+    of the corpus, for each formatter."""
+    from benchmark_formatters import get_formatters, install_stand_ins
+
+    with open(os.path.join(HERE, "corpus.json"), encoding="utf8") as f:
+        corpus = json.load(f)
+    fake_display, shell = install_stand_ins()
+    formatters = get_formatters(fake_display, shell)
+    for function in formatters.values():
+        function(corpus[0]["info"], "explain")  # warm up: imports, themes, etc.
+
+    tracemalloc.start(args.frames)
+    print(f"{'formatter':25}{'exception':25}{'peak':>15}{'retained':>15}")
+    for name, function in formatters.items():
+        for entry in corpus:
+            gc.collect()
+            before, _peak = tracemalloc.get_traced_memory()
+            tracemalloc.reset_peak()
+            function(entry["info"], "explain")
+            after, peak = tracemalloc.get_traced_memory()
+            print(
+                f"{name:25}{entry['name']:25}{kib(peak - before):>15}"
+                f"{kib(after - before):>15}"
+            )
+    tracemalloc.stop()
+
+
+def growth_points(console=None, shell=None):
+    """Returns the size of the data structures known to grow with
+    the number of inputs."""
+    from friendly_traceback import source_cache
+    from friendly_traceback.config import session
+
+    points = {
+        "session.saved_info": len(session.saved_info),
+        "session.friendly_info": len(session.friendly_info),
+        "source_cache entries": len(source_cache.cache.cache),
+        "linecache entries": len(linecache.cache),
+    }
+    if "rich" in sys.modules:
+        from rich.console import Console
+
+        gc.collect()
+        points["rich Console instances"] = sum(
+            isinstance(obj, Console) for obj in gc.get_objects()
+        )
+    if console is not None:
+        points["console.old_locals"] = len(console.old_locals)
+        points["console code blocks"] = sum(
+            filename.startswith("<friendly-console:")
+            for filename in source_cache.cache.cache
+        )
+    if shell is not None:
+        points["IPython input history"] = len(shell.history_manager.input_hist_raw)
+        points["IPython output history"] = len(shell.history_manager.output_hist)
+    return points
+
+
+def report_growth(first, second, inputs, top):
+    """Compares two snapshots, attributing the growth to packages."""
+    ignore = [
+        tracemalloc.Filter(False, tracemalloc.__file__),
+        tracemalloc.Filter(False, __file__),
+    ]
+    first = first.filter_traces(ignore)
+    second = second.filter_traces(ignore)
+    differences = second.compare_to(first, "traceback")
+    by_package = {}
+    for difference in differences:
+        package = category(difference.traceback)
+        by_package[package] = by_package.get(package, 0) + difference.size_diff
+    total = sum(by_package.values())
+    print(f"\nGrowth after {inputs} more inputs: {kib(total)}")
+    print(f"    {kib(total / inputs)} per input")
+    for package, size in sorted(by_package.items(), key=lambda item: -item[1]):
+        print(f"    {package:25}{kib(size)}")
+
+    print(f"\nTop {top} lines:")
+    for difference in second.compare_to(first, "lineno")[:top]:
+        frame = difference.traceback[-1]
+        print(
+            f"    {kib(difference.size_diff)}  {difference.count_diff:+8d} blocks  "
+            f"{frame.filename}:{frame.lineno}"
+        )
+
+
+def report_points(first, second):
+    print(f"\n{'growth point':30}{'before':>10}{'after':>10}")
+    for name, value in second.items():
+        print(f"{name:30}{first.get(name, 0):>10}{value:>10}")
+
+
+def run_session(push, inputs, console=None, shell=None):
+    """Sends inputs to a session, taking snapshots once a steady state
+    is expected to be reached and after all the inputs have been sent.
+    Returns the snapshots and the corresponding growth points."""
+    warm_up = len(SESSION_INPUTS) * 5
+    count = 0
+    while count < warm_up:
+        push(SESSION_INPUTS[count % len(SESSION_INPUTS)])
+        count += 1
+    gc.collect()
+    first = tracemalloc.take_snapshot()
+    first_points = growth_points(console, shell)
+    while count < warm_up + inputs:
+        push(SESSION_INPUTS[count % len(SESSION_INPUTS)])
+        count += 1
+    gc.collect()
+    second = tracemalloc.take_snapshot()
+    second_points = growth_points(console, shell)
+    return first, second, first_points, second_points
+
+
+def report_session(args, results):
+    first, second, first_points, second_points = results
+    report_growth(first, second, args.inputs, args.top)
+    report_points(first_points, second_points)
+
+
+def profile_console(args):
+    """Reports the memory growth of a FriendlyConsole session."""
+    import friendly_traceback
+    from friendly.console import FriendlyConsole
+    from friendly.rich_console_helpers import helpers
+
+    sink = Sink()
+    with contextlib.redirect_stdout(sink), contextlib.redirect_stderr(sink):
+        friendly_traceback.install(include="friendly_tb")
+        console = FriendlyConsole(local_vars=helpers, formatter=args.formatter)
+
+        def push(source):
+            for line in source.split("\n"):
+                console.push(line)
+
+        tracemalloc.start(args.frames)
+        results = run_session(push, args.inputs, console=console)
+    report_session(args, results)
+
+
+def profile_ipython(args):
+    """Reports the memory growth of an IPython session using friendly."""
+    try:
+        from IPython.core.interactiveshell import InteractiveShell
+    except ImportError:
+        print("IPython is not available.")
+        return
+
+    sink = Sink()
+    with contextlib.redirect_stdout(sink), contextlib.redirect_stderr(sink):
+        shell = InteractiveShell.instance()
+        import friendly.ipython  # noqa
+
+        shell.push(friendly.ipython.helpers)
+        friendly.set_formatter(args.formatter)
+
+        def push(source):
+            shell.run_cell(source, store_history=True)
+
+        tracemalloc.start(args.frames)
+        results = run_session(push, args.inputs, shell=shell)
+    report_session(args, results)
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.split("\n")[0])
+    parser.add_argument("suites", nargs="*", metavar="suite", help=", ".join(SUITES))
+    parser.add_argument("--inputs", type=int, default=2000)
+    parser.add_argument("--formatter", default="dark")
+    parser.add_argument("--top", type=int, default=10)
+    parser.add_argument("--frames", type=int, default=10)
+    args = parser.parse_args()
+    for suite in args.suites:
+        if suite not in SUITES:
+            parser.error(f"unknown suite: {suite}")
+
+    if len(args.suites) != 1:
+        # Each suite is run in its own process, so that the memory used
+        # by one of them does not affect the others.
+        options = [
+            f"--inputs={args.inputs}",
+            f"--formatter={args.formatter}",
+            f"--top={args.top}",
+            f"--frames={args.frames}",
+        ]
+        for suite in args.suites or SUITES:
+            print(f"\n===== {suite} =====\n", flush=True)
+            subprocess.run([sys.executable, __file__, suite] + options, check=False)
+        return
+
+    suite = args.suites[0]
+    if suite == "formatters":
+        profile_formatters(args)
+    elif suite == "console":
+        profile_console(args)
+    else:
+        profile_ipython(args)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,96 @@
+"""Records the information obtained by friendly-traceback for a few
+representative exceptions, in English and in French, and saves it
+as JSON so that it can be used to benchmark the formatters.
+
+Usage::
+
+    python tools/record_corpus.py [output_path]
+
+The default output path is corpus.json, in the same directory as this file.
+"""
+import json
+import os
+import sys
+
+import friendly_traceback
+from friendly_traceback import core, source_cache
+
+LANGUAGES = ["en", "fr"]
+HERE = os.path.dirname(os.path.abspath(__file__))
+
+
+def syntax_error():
+    filename = "<corpus-syntax-error>"
+    source = "def f(x):\n    if x = 1:\n        return x\n"
+    source_cache.cache.add(filename, source)
+    compile(source, filename, "exec")
+
+
+def name_error():
+    total = 0
+    for value in range(3):
+        total += valeu  # noqa
+    return total
+
+
+def recursion_error():
+    # Python collapses identical consecutive lines in tracebacks, but not
+    # sequences of frames as obtained with mutually recursive functions.
+    def is_even(n):
+        return True if n == 0 else is_odd(n - 1)
+
+    def is_odd(n):
+        return False if n == 0 else is_even(n - 1)
+
+    is_even(100_000)
+
+
+def huge_variables():
+    table = {index: str(index) * 10 for index in range(100_000)}
+    line = "x = " + "1 + " * 10_000 + "1"
+    return table[line]
+
+
+CASES = {
+    "SyntaxError": syntax_error,
+    "NameError": name_error,
+    "RecursionError": recursion_error,
+    "huge_variables": huge_variables,
+}
+
+
+def record(function):
+    """Runs a function raising an exception and returns the information
+    obtained by friendly-traceback, keeping only the items that
+    can be saved as JSON."""
+    try:
+        function()
+    except Exception:  # noqa
+        etype, value, tb = sys.exc_info()
+    tb_info = core.FriendlyTraceback(etype, value, tb)
+    tb_info.compile_info()
+    info = tb_info.info
+    info["lang"] = friendly_traceback.get_lang()
+    # Paths are made relative to this directory, so that the corpus
+    # does not depend on where it was recorded.
+    return {
+        key: value.replace(HERE + os.sep, "")
+        for key, value in info.items()
+        if isinstance(value, str)
+    }
+
+
+def main(path=None):
+    if path is None:
+        path = os.path.join(HERE, "corpus.json")
+    corpus = []
+    for lang in LANGUAGES:
+        friendly_traceback.set_lang(lang)
+        for name, function in CASES.items():
+            corpus.append({"name": f"{name}-{lang}", "info": record(function)})
+    with open(path, "w", encoding="utf8") as f:
+        json.dump(corpus, f, indent=1, ensure_ascii=False)
+
+
+if __name__ == "__main__":
+    main(*sys.argv[1:2])